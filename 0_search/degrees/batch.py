@@ -0,0 +1,109 @@
+"""
+Answers many degrees queries with a single load of the data
+
+Reads one tab-separated pair of names per line and writes one JSON object
+per line with the degrees of separation, the path and the search time.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import degrees
+from query import DegreesQuery
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer degrees queries for tab-separated name pairs.")
+    parser.add_argument("directory", help="directory with the CSV files")
+    parser.add_argument("pairs", nargs="?", default="-",
+                        help="file with one name pair per line "
+                             "(default: standard input)")
+    parser.add_argument("--ambiguous", choices=["first", "skip"],
+                        default="first",
+                        help="how to resolve names shared by several people")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the CSV files instead of the snapshot")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="number of recent results to remember")
+    parser.add_argument("--landmarks", type=int, default=0,
+                        help="number of landmark people to index")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    degrees.load_data(args.directory, cache=not args.no_cache)
+    print(f"Data loaded in {time.perf_counter() - start:.3f}s.",
+          file=sys.stderr)
+
+    searcher = DegreesQuery(args.cache_size, args.landmarks)
+    if args.pairs == "-":
+        run(sys.stdin, sys.stdout, args.ambiguous, searcher)
+    else:
+        with open(args.pairs, encoding="utf-8") as f:
+            run(f, sys.stdout, args.ambiguous, searcher)
+    print(json.dumps(searcher.stats()), file=sys.stderr)
+
+
+def run(lines, output, ambiguous="first", searcher=None):
+    """
+    Writes a JSON result line to output for every name pair in lines.
+    """
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        result = query(line, ambiguous, searcher)
+        print(json.dumps(result), file=output, flush=True)
+
+
+def query(line, ambiguous="first", searcher=None):
+    """
+    Returns the result of the query on a single line of input as a dict,
+    searching through a DegreesQuery if one is given.
+    """
+    pair = [name.strip() for name in line.split("\t")]
+    if len(pair) != 2:
+        return {"query": line, "error": "Expected two tab-separated names."}
+
+    result = {"source": pair[0], "target": pair[1]}
+    ids = []
+    for name in pair:
+        person_id = degrees.person_id_for_name(name, ambiguous=ambiguous)
+        if person_id is None:
+            if len(degrees.names.get(name.lower(), ())) > 1:
+                result["error"] = f"Ambiguous name: {name}"
+            else:
+                result["error"] = f"Person not found: {name}"
+            return result
+        ids.append(person_id)
+    result["source_id"], result["target_id"] = ids
+
+    start = time.perf_counter()
+    if searcher is None:
+        path = degrees.shortest_path(ids[0], ids[1])
+    else:
+        path = searcher.shortest_path(ids[0], ids[1])
+    result["seconds"] = round(time.perf_counter() - start, 6)
+
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        degrees.load_details([person_id for _, person_id in path],
+                             [movie_id for movie_id, _ in path])
+        result["path"] = [
+            {"movie_id": movie_id,
+             "movie": degrees.movies[movie_id]["title"],
+             "person_id": person_id,
+             "person": degrees.people[person_id]["name"]}
+            for movie_id, person_id in path
+        ]
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import argparse
 import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import (build_graph, load_snapshot, snapshot_key, snapshot_path,
+                   write_snapshot)
+from util import DisjointSet, Node, IndexedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,54 +15,274 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph holding the stars in compact mode, None otherwise. In compact
+# mode people and movies carry no movies and stars sets.
+graph = None
 
-def load_data(directory):
+# Labels every person with a representative of their connected component.
+# Keyed by person_id, or an array indexed like the graph in compact mode.
+components = None
+
+# Directory the data was loaded from, used to load skipped fields later
+data_directory = None
+
+
+def load_data(directory, compact=False, cache=True, years=None, min_cast=0,
+              lazy=False):
     """
     Load data from CSV files into memory.
+
+    If compact is True, the stars are stored in an integer-indexed
+    CompactGraph instead of per-row sets.
+
+    If cache is True, the data is loaded from a memory-mapped snapshot next
+    to the directory, which is (re)written from the CSV files whenever they
+    change. Cached data is always loaded in compact mode.
+
+    The rows can be filtered while they are parsed: years is an inclusive
+    (first, last) range of movie years, either end of which may be None,
+    and min_cast drops movies with fewer stars. If lazy is True, the birth
+    and title fields are skipped and only loaded by load_details. Filtered
+    or lazy loads never use the snapshot.
     """
+    global graph, components, data_directory
+
+    data_directory = directory
+    if years is not None or min_cast > 0 or lazy:
+        cache = False
+
+    if cache:
+        key = snapshot_key(directory)
+        snapshot = load_snapshot(snapshot_path(directory), key)
+        if snapshot is not None:
+            load_snapshot_data(snapshot)
+            return
+        compact = True
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for person_id, name, birth in read_people(directory, details=not lazy):
+        people[person_id] = {"name": name}
+        if birth is not None:
+            people[person_id]["birth"] = birth
+        if not compact:
+            people[person_id]["movies"] = set()
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
+
+    # Load movies, counting their casts first if small ones are dropped
+    cast_ids = None
+    if min_cast > 0:
+        cast_ids = movies_with_cast(directory, min_cast)
+    for movie_id, title, year in read_movies(directory, years,
+                                             details=not lazy,
+                                             movie_ids=cast_ids):
+        movies[movie_id] = {"year": year}
+        if title is not None:
+            movies[movie_id]["title"] = title
+        if not compact:
+            movies[movie_id]["stars"] = set()
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    stars = read_stars(directory, movies)
+    if compact:
+        graph = build_graph(list(people), list(movies), stars)
+        components = graph.components()
+        if cache:
+            # A missing snapshot only costs the next run its start-up time
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
+                write_snapshot(snapshot_path(directory), key, graph,
+                               components, people, movies)
+            except OSError:
                 pass
+        return
+
+    graph = None
+    for person_id, movie_id in stars:
+        try:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+        except KeyError:
+            pass
+    components = label_components()
+
+
+def read_rows(directory, filename):
+    """
+    Yields the rows of a CSV file in the data directory one at a time.
+    """
+    with open(f"{directory}/{filename}", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def read_people(directory, details=True):
+    """
+    Yields (person_id, name, birth) triples from people.csv. birth is None
+    unless details is True.
+    """
+    for row in read_rows(directory, "people.csv"):
+        yield row["id"], row["name"], row["birth"] if details else None
+
+
+def read_movies(directory, years=None, details=True, movie_ids=None):
+    """
+    Yields (movie_id, title, year) triples from movies.csv, keeping only
+    movies released within the inclusive years range and movies in
+    movie_ids, if given. title is None unless details is True.
+    """
+    first, last = years if years is not None else (None, None)
+    for row in read_rows(directory, "movies.csv"):
+        if movie_ids is not None and row["id"] not in movie_ids:
+            continue
+        if years is not None:
+            try:
+                year = int(row["year"])
+            except ValueError:
+                continue
+            if ((first is not None and year < first)
+                    or (last is not None and year > last)):
+                continue
+        yield row["id"], row["title"] if details else None, row["year"]
+
+
+def movies_with_cast(directory, min_cast):
+    """
+    Returns the set of ids of movies with at least min_cast rows in
+    stars.csv, counted in a pass over the file.
+    """
+    cast = {}
+    for row in read_rows(directory, "stars.csv"):
+        cast[row["movie_id"]] = cast.get(row["movie_id"], 0) + 1
+    return {movie_id for movie_id, count in cast.items()
+            if count >= min_cast}
+
+
+def read_stars(directory, movie_ids):
+    """
+    Yields (person_id, movie_id) pairs from stars.csv for movies in
+    movie_ids.
+    """
+    for row in read_rows(directory, "stars.csv"):
+        if row["movie_id"] in movie_ids:
+            yield row["person_id"], row["movie_id"]
+
+
+def load_details(person_ids=(), movie_ids=()):
+    """
+    Load the birth and title fields skipped by a lazy load_data for the
+    given people and movies.
+    """
+    person_ids = {i for i in person_ids if "birth" not in people[i]}
+    movie_ids = {i for i in movie_ids if "title" not in movies[i]}
+
+    if person_ids:
+        for row in read_rows(data_directory, "people.csv"):
+            if row["id"] in person_ids:
+                people[row["id"]]["birth"] = row["birth"]
+    if movie_ids:
+        for row in read_rows(data_directory, "movies.csv"):
+            if row["id"] in movie_ids:
+                movies[row["id"]]["title"] = row["title"]
+
+
+def label_components():
+    """
+    Returns a dict labelling every person_id with a representative of its
+    connected component, found by union-find over the stars of every movie.
+    """
+    person_ids = list(people)
+    index = {person_id: i for i, person_id in enumerate(person_ids)}
+    sets = DisjointSet(len(person_ids))
+    for movie in movies.values():
+        stars = [index[person_id] for person_id in movie["stars"]]
+        for star in stars[1:]:
+            sets.union(stars[0], star)
+    return dict(zip(person_ids, sets.labels()))
+
+
+def connected(source, target):
+    """
+    Returns False if source and target lie in different connected
+    components, True otherwise.
+    """
+    if components is None:
+        return True
+    if graph is None:
+        return components[source] == components[target]
+    return (components[graph.person_index[source]]
+            == components[graph.person_index[target]])
+
+
+def component_stats():
+    """
+    Returns the number of connected components, the size of the largest one,
+    the number of people who share no movie with anyone, and a dict mapping
+    every component size to the number of components of that size.
+    """
+    if components is None:
+        return None
+    label_sizes = {}
+    for label in (components.values() if graph is None else components):
+        label_sizes[label] = label_sizes.get(label, 0) + 1
+    sizes = {}
+    for size in label_sizes.values():
+        sizes[size] = sizes.get(size, 0) + 1
+
+    return {
+        "components": len(label_sizes),
+        "largest": max(label_sizes.values(), default=0),
+        "isolated": sizes.get(1, 0),
+        "sizes": dict(sorted(sizes.items()))
+    }
+
+
+def load_snapshot_data(snapshot):
+    """
+    Load people, movies and names from a Snapshot and use its graph and
+    component labels.
+    """
+    global graph, components
+
+    graph = snapshot.graph()
+    components = snapshot.array("components")
+    for person_id, name, birth in zip(graph.person_ids,
+                                      snapshot.column("names"),
+                                      snapshot.column("births")):
+        people[person_id] = {"name": name, "birth": birth}
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
+
+    for movie_id, title, year in zip(graph.movie_ids,
+                                     snapshot.column("titles"),
+                                     snapshot.column("years")):
+        movies[movie_id] = {"title": title, "year": year}
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="directory with the CSV files")
+    parser.add_argument("--compact", action="store_true",
+                        help="store the stars in a compact graph")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the CSV files instead of the snapshot")
+    parser.add_argument("--years", type=parse_years,
+                        help="only load movies from a range such as "
+                             "1990-2000, 1990- or -2000")
+    parser.add_argument("--min-cast", type=int, default=0,
+                        help="only load movies with at least this many stars")
+    parser.add_argument("--lazy", action="store_true",
+                        help="load births and titles only when printed")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, cache=not args.no_cache,
+              years=args.years, min_cast=args.min_cast, lazy=args.lazy)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -76,6 +299,8 @@ def main():
     else:
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
+        load_details([person_id for _, person_id in path] + [source],
+                     [movie_id for movie_id, _ in path])
         path = [(None, source)] + path
         for i in range(degrees):
             person1 = people[path[i][1]]["name"]
@@ -84,71 +309,222 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def parse_years(text):
+    """
+    Parses a year range such as 1990-2000, 1990- or -2000 into a
+    (first, last) pair.
+    """
+    first, sep, last = text.partition("-")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Invalid year range: {text}")
+    try:
+        return (int(first) if first else None, int(last) if last else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid year range: {text}")
+
+
+def shortest_path(source, target, stats=None, lower_bound=None, limit=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If stats is a util.SearchStats, the work done is recorded in it.
+
+    If lower_bound(person_id, other_id) bounds the degrees of separation of
+    two people from below and the two are known to be at most limit degrees
+    apart, people who cannot lie on such a path are not expanded.
     """
+    if stats is not None:
+        stats.start("components")
+    path = search_path(source, target, stats, lower_bound, limit)
+    if stats is not None:
+        stats.stop()
+    return path
 
-    # Create a frontier and add the source as its initial node
-    frontier = QueueFrontier()
-    frontier.add(Node(source, None, None))
 
-    # Create empty explored set
-    explored_states = []
+def search_path(source, target, stats=None, lower_bound=None, limit=None):
+    """
+    Searches for a shortest path in whichever representation was loaded.
+    """
+    # People in different components are answered without any search
+    if not connected(source, target):
+        return None
 
-    # Searching for a node with target state by removing nodes from the
-    # frontier and adding their neighbors to it
-    while True:
-        # If the forntier is empty, there is no path to between source and
-        # target and thus None is returned
-        if frontier.empty():
-            return None
+    if graph is None:
+        return bidirectional_search(source, target, neighbors_for_person,
+                                    stats, lower_bound, limit)
+
+    # Search over dense indices and translate the path back to IMDB ids
+    index_bound = None
+    if lower_bound is not None:
+        person_ids = graph.person_ids
+
+        def index_bound(person, other):
+            return lower_bound(person_ids[person], person_ids[other])
+
+    path = bidirectional_search(graph.person_index[source],
+                                graph.person_index[target], graph.neighbors,
+                                stats, index_bound, limit)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def bidirectional_search(source, target, neighbors, stats=None,
+                         lower_bound=None, limit=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect the
+    source to the target, where neighbors(state) yields the (action, state)
+    pairs adjacent to a state.
+
+    If no possible path, returns None.
 
-        # Remove a node from the frontier and jumpt out of the cycle, if it
-        # containts the target we are searching for
-        target_node = frontier.get_node_with_state(target)
-        if not target_node:
-            removed = frontier.remove()
+    If lower_bound(state, other) bounds the distance between two states from
+    below and the source and the target are at most limit steps apart, a
+    state reached d steps from one end is not expanded if d plus its lower
+    bound to the other end exceeds limit. Such a state cannot lie on a
+    shortest path, so the result is the same, but fewer states are expanded.
+    """
+    if source == target:
+        return []
+
+    # Grow one frontier from the source and one from the target. Since
+    # starring together is a symmetric relation, both searches can use the
+    # same neighbors function.
+    forward = IndexedQueueFrontier()
+    forward.add(Node(source, None, None))
+    backward = IndexedQueueFrontier()
+    backward.add(Node(target, None, None))
+
+    # Map every reached person to the node that reached it, one map per
+    # direction. A person reached from both sides joins the two searches.
+    forward_reached = {source: forward.frontier[0]}
+    backward_reached = {target: backward.frontier[0]}
+
+    # Number of levels expanded so far in each direction
+    forward_depth = 0
+    backward_depth = 0
+
+    forward_prune = backward_prune = None
+    if lower_bound is not None and limit is not None:
+        def forward_prune(state, depth):
+            return depth + lower_bound(state, target) > limit
+
+        def backward_prune(state, depth):
+            return depth + lower_bound(state, source) > limit
+
+    # Expand the smaller frontier by one whole level at a time. If either
+    # frontier runs out, the source and the target are not connected.
+    while not forward.empty() and not backward.empty():
+        if len(forward.frontier) <= len(backward.frontier):
+            if stats is not None:
+                stats.start("forward")
+            meeting = expand_level(forward, forward_reached,
+                                   backward_reached, neighbors, stats,
+                                   len(backward.frontier), forward_prune,
+                                   forward_depth + 1)
+            forward_depth += 1
         else:
-            break
+            if stats is not None:
+                stats.start("backward")
+            meeting = expand_level(backward, backward_reached,
+                                   forward_reached, neighbors, stats,
+                                   len(forward.frontier), backward_prune,
+                                   backward_depth + 1)
+            backward_depth += 1
 
-        # Add the state of removed node to the explored states to avoid cycles
-        explored_states.add(removed.state)
+        if meeting is not None:
+            if stats is not None:
+                stats.start("join")
+            return join_paths(forward_reached[meeting],
+                              backward_reached[meeting])
 
-        # Add neighbors of removed node to the frontier
-        for neighbor in neighbors_for_person(removed.state):
-            state = neighbor[1]
-            action = neighbor[0]
-            if state not in explored_states:
-                frontier.add(Node(state, removed, action))
+    return None
 
-        target_node = None
 
-    # Reconstruct the path to the target node
-    path = []
-    index = target_node
-    while True:
-        if index.state == source:
-            path.reverse()
-            return path
+def expand_level(frontier, reached, other_reached, neighbors, stats=None,
+                 other_size=0, prune=None, depth=0):
+    """
+    Expands every node currently in the frontier, adding newly reached
+    neighbors to it. other_size is the size of the opposite frontier, which
+    only matters for the stats.
+
+    Newly reached states are depth steps from the start of this search. If
+    prune(state, depth) is true, a state is reached but not added to the
+    frontier.
 
+    Returns the first state reached by both searches, or None.
+    """
+    for _ in range(len(frontier.frontier)):
+        removed = frontier.remove()
+        for action, state in neighbors(removed.state):
+            if state in reached:
+                continue
+            node = Node(state, removed, action)
+            reached[state] = node
+
+            # Levels are expanded completely, so the first meeting point
+            # found already lies on a shortest path
+            if state in other_reached:
+                return state
+            if prune is not None and prune(state, depth):
+                continue
+            frontier.add(node)
+
+        if stats is not None:
+            stats.expanded(len(frontier.frontier) + other_size,
+                           len(reached) + len(other_reached))
+
+    return None
+
+
+def join_paths(forward_node, backward_node):
+    """
+    Returns the (action, state) pairs leading from the source through the
+    meeting state to the target.
+    """
+    # Walk back from the meeting person to the source
+    path = []
+    index = forward_node
+    while index.parent is not None:
         path.append((index.action, index.state))
         index = index.parent
+    path.reverse()
+
+    # Walk on from the meeting person to the target
+    index = backward_node
+    while index.parent is not None:
+        path.append((index.action, index.parent.state))
+        index = index.parent
 
+    return path
 
-def person_id_for_name(name):
+
+def person_id_for_name(name, ambiguous="ask"):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    The ambiguous policy decides what happens when several people share the
+    name: "ask" prompts for the intended id, "first" picks the smallest id
+    and "skip" returns None.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if ambiguous == "first":
+            return min(person_ids, key=lambda i: (len(i), i))
+        elif ambiguous == "skip":
+            return None
+        elif ambiguous != "ask":
+            raise ValueError(f"Unknown ambiguity policy: {ambiguous}")
+
         print(f"Which '{name}'?")
+        load_details(person_ids)
         for person_id in person_ids:
             person = people[person_id]
             name = person["name"]
@@ -170,6 +546,11 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person
+                in graph.neighbors(graph.person_index[person_id])}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -179,6 +560,8 @@ def neighbors_for_person(person_id):
 
 
 def print_frontier(frontier):
+    load_details(movie_ids=[node.action for node in frontier.frontier
+                            if node.action])
     for node in frontier.frontier:
         person = people[node.state]['name']
         if not node.action:
@@ -195,6 +578,7 @@ def print_frontier(frontier):
 
 def print_path(path, source):
     state = people[source]['name']
+    load_details(movie_ids=[link[0] for link in path])
     path.reverse()
     for link in path:
         action = movies[link[0]]['title']
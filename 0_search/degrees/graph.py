@@ -0,0 +1,376 @@
+"""
+Compact, integer-indexed representation of the star graph
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from util import DisjointSet
+
+# First bytes of every snapshot file, bumped whenever the layout changes
+SNAPSHOT_MAGIC = b"DEGREES3"
+
+# Integer sections of a snapshot holding the graph, stored as raw native
+# int32 arrays
+GRAPH_SECTIONS = ["person_offsets", "person_movies",
+                  "movie_offsets", "movie_people"]
+
+# Further integer sections of a snapshot
+INT_SECTIONS = GRAPH_SECTIONS + ["components"]
+
+# Text sections of a snapshot, stored as NUL-separated UTF-8 strings with
+# their number of strings in the header, since an empty section may hold no
+# strings or a single empty one
+TEXT_SECTIONS = ["person_ids", "names", "births",
+                 "movie_ids", "titles", "years"]
+
+
+class CompactGraph():
+    """
+    Bipartite graph of people and the movies they starred in, stored in
+    compressed sparse row (CSR) form.
+
+    People and movies are numbered densely from zero. The movies of person p
+    are person_movies[person_offsets[p]:person_offsets[p + 1]] and the stars
+    of movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies,
+                 movie_offsets, movie_people):
+        # Dense index -> IMDB id
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+
+        # IMDB id -> dense index, built on first use
+        self._person_index = None
+        self._movie_index = None
+
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+    @property
+    def person_index(self):
+        if self._person_index is None:
+            self._person_index = {
+                person_id: i for i, person_id in enumerate(self.person_ids)
+            }
+        return self._person_index
+
+    @property
+    def movie_index(self):
+        if self._movie_index is None:
+            self._movie_index = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        return self._movie_index
+
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def movies_of(self, person):
+        """Returns the indices of movies the person starred in."""
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """Returns the indices of people who starred in the movie."""
+        offsets = self.movie_offsets
+        return self.movie_people[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred with the
+        given person.
+        """
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for movie in self.movies_of(person):
+            for costar in movie_people[movie_offsets[movie]:
+                                       movie_offsets[movie + 1]]:
+                yield movie, costar
+
+    def degree(self, person):
+        """Returns the number of movies the person starred in."""
+        return self.person_offsets[person + 1] - self.person_offsets[person]
+
+    def distance_counts(self, source):
+        """
+        Runs a breadth-first search from source and returns a list whose
+        d-th item is the number of people at distance d from it.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+
+        # Every movie links all of its stars, so each one is expanded once
+        seen_people = bytearray(self.person_count())
+        seen_movies = bytearray(self.movie_count())
+        seen_people[source] = 1
+        level = [source]
+        counts = []
+        while level:
+            counts.append(len(level))
+            next_level = []
+            for person in level:
+                for movie in person_movies[person_offsets[person]:
+                                           person_offsets[person + 1]]:
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for costar in movie_people[movie_offsets[movie]:
+                                               movie_offsets[movie + 1]]:
+                        if not seen_people[costar]:
+                            seen_people[costar] = 1
+                            next_level.append(costar)
+            level = next_level
+
+        return counts
+
+    def search_tree(self, source):
+        """
+        Runs a breadth-first search from source and returns three arrays
+        indexed by person: the distance of every person from source, or -1
+        if they are not reached, and the movie and the person of their step
+        towards source, or -1 for source and unreached people.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+
+        count = self.person_count()
+        distances = array("i", [-1]) * count
+        parent_movies = array("i", [-1]) * count
+        parent_people = array("i", [-1]) * count
+        seen_movies = bytearray(self.movie_count())
+        distances[source] = 0
+        level = [source]
+        distance = 0
+        while level:
+            distance += 1
+            next_level = []
+            for person in level:
+                for movie in person_movies[person_offsets[person]:
+                                           person_offsets[person + 1]]:
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for costar in movie_people[movie_offsets[movie]:
+                                               movie_offsets[movie + 1]]:
+                        if distances[costar] < 0:
+                            distances[costar] = distance
+                            parent_movies[costar] = movie
+                            parent_people[costar] = person
+                            next_level.append(costar)
+            level = next_level
+
+        return distances, parent_movies, parent_people
+
+    def components(self):
+        """
+        Returns an array labelling every person with a representative of
+        their connected component.
+        """
+        sets = DisjointSet(self.person_count())
+        for movie in range(self.movie_count()):
+            stars = self.stars_of(movie)
+            for star in stars[1:]:
+                sets.union(stars[0], star)
+        return array("i", sets.labels())
+
+
+def build_graph(person_ids, movie_ids, stars):
+    """
+    Builds a CompactGraph from lists of person and movie ids and an iterable
+    of (person_id, movie_id) star pairs.
+
+    Pairs referring to unknown people or movies are skipped and duplicate
+    pairs are counted once, as in load_data.
+    """
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    movie_count = len(movie_ids)
+
+    # Encode each edge as a single integer so that sorting groups the edges
+    # by person and removes duplicates in one go
+    edges = set()
+    for person_id, movie_id in stars:
+        try:
+            edges.add(person_index[person_id] * movie_count
+                      + movie_index[movie_id])
+        except KeyError:
+            pass
+    edges = sorted(edges)
+
+    # Person -> movies rows come straight out of the sorted edges
+    person_offsets = array("i", bytes(4 * (len(person_ids) + 1)))
+    person_movies = array("i", bytes(4 * len(edges)))
+    movie_counts = array("i", bytes(4 * (movie_count + 1)))
+    for i, edge in enumerate(edges):
+        person, movie = divmod(edge, movie_count)
+        person_offsets[person + 1] += 1
+        person_movies[i] = movie
+        movie_counts[movie + 1] += 1
+    for i in range(len(person_ids)):
+        person_offsets[i + 1] += person_offsets[i]
+
+    # Movie -> people rows are filled by counting sort
+    for i in range(movie_count):
+        movie_counts[i + 1] += movie_counts[i]
+    movie_offsets = array("i", movie_counts)
+    movie_people = array("i", bytes(4 * len(edges)))
+    for edge in edges:
+        person, movie = divmod(edge, movie_count)
+        movie_people[movie_counts[movie]] = person
+        movie_counts[movie] += 1
+
+    return CompactGraph(list(person_ids), list(movie_ids), person_offsets,
+                        person_movies, movie_offsets, movie_people)
+
+
+class Snapshot():
+    """
+    Read-only view of a snapshot file written by write_snapshot.
+
+    The file is memory-mapped, so the graph arrays are used in place without
+    being copied, and text sections are only decoded when asked for.
+    """
+
+    def __init__(self, path, mapping, sections, rows):
+        self.path = path
+        self.mapping = mapping
+        self.sections = sections
+        self.rows = rows
+        self.view = memoryview(mapping)
+
+    def array(self, name):
+        """Returns an int32 view of an integer section."""
+        offset, size = self.sections[name]
+        return self.view[offset:offset + size].cast("i")
+
+    def column(self, name):
+        """Returns the list of strings stored in a text section."""
+        offset, size = self.sections[name]
+        if self.rows[name] == 0:
+            return []
+        return bytes(self.view[offset:offset + size]).decode().split("\0")
+
+    def graph(self, ids=True):
+        """
+        Returns a CompactGraph over the mapped arrays. If ids is False, the
+        IMDB ids are not decoded and only dense indices can be used.
+        """
+        person_ids = self.column("person_ids") if ids else None
+        movie_ids = self.column("movie_ids") if ids else None
+        return CompactGraph(person_ids, movie_ids,
+                            *(self.array(name) for name in GRAPH_SECTIONS))
+
+
+def snapshot_path(directory):
+    """Returns the path of the snapshot kept next to a data directory."""
+    return os.path.normpath(directory) + ".snapshot"
+
+
+def snapshot_key(directory):
+    """
+    Returns the name, modification time and size of every CSV file of a data
+    directory. A snapshot is only valid for the key it was written with.
+    """
+    key = []
+    for name in ["people.csv", "movies.csv", "stars.csv"]:
+        stat = os.stat(os.path.join(directory, name))
+        key.append([name, stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def write_snapshot(path, key, graph, components, people, movies):
+    """
+    Writes the graph, its component labels and the printable fields of
+    people and movies to a snapshot file at path.
+    """
+    payloads = {name: getattr(graph, name).tobytes()
+                for name in GRAPH_SECTIONS}
+    payloads["components"] = components.tobytes()
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    columns = {
+        "person_ids": person_ids,
+        "names": [people[i]["name"] for i in person_ids],
+        "births": [people[i]["birth"] for i in person_ids],
+        "movie_ids": movie_ids,
+        "titles": [movies[i]["title"] for i in movie_ids],
+        "years": [movies[i]["year"] for i in movie_ids]
+    }
+    for name in TEXT_SECTIONS:
+        payloads[name] = "\0".join(columns[name]).encode()
+
+    # Lay the sections out one after another, each aligned to 8 bytes. The
+    # header gets room for its offsets to grow and is padded with spaces.
+    names = INT_SECTIONS + TEXT_SECTIONS
+    header = {"key": key, "byteorder": sys.byteorder,
+              "sections": {name: [0, len(payloads[name])] for name in names},
+              "rows": {name: len(columns[name]) for name in TEXT_SECTIONS}}
+    length = len(json.dumps(header).encode()) + 20 * len(names)
+    offset = align(len(SNAPSHOT_MAGIC) + 4 + length)
+    for name in names:
+        header["sections"][name] = [offset, len(payloads[name])]
+        offset = align(offset + len(payloads[name]))
+    encoded = json.dumps(header).encode().ljust(length)
+
+    # Write to a temporary file first so that readers never see a partial
+    # snapshot
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        for name in names:
+            f.write(bytes(header["sections"][name][0] - f.tell()))
+            f.write(payloads[name])
+    os.replace(temporary, path)
+
+
+def load_snapshot(path, key=None):
+    """
+    Memory-maps the snapshot at path and returns it as a Snapshot.
+
+    Returns None if there is no snapshot, if it is unreadable or if it was
+    written for a different key.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    start = len(SNAPSHOT_MAGIC)
+    try:
+        if mapping[:start] != SNAPSHOT_MAGIC:
+            raise ValueError("not a snapshot")
+        (length,) = struct.unpack("<I", mapping[start:start + 4])
+        header = json.loads(mapping[start + 4:start + 4 + length])
+    except (ValueError, struct.error):
+        mapping.close()
+        return None
+
+    if ((key is not None and header["key"] != key)
+            or header["byteorder"] != sys.byteorder):
+        mapping.close()
+        return None
+
+    return Snapshot(path, mapping, header["sections"], header["rows"])
+
+
+def align(offset):
+    """Rounds offset up to a multiple of 8."""
+    return (offset + 7) // 8 * 8
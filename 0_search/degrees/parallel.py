@@ -0,0 +1,122 @@
+"""
+Computes degrees of separation from many people in parallel
+
+Every worker process memory-maps the same read-only snapshot of the graph,
+so the data is shared through the page cache instead of being pickled into
+each worker. For every source person, one JSON line is written with the
+number of people at each distance (the histogram) and the eccentricity,
+i.e. the largest distance to anyone reachable.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from graph import load_snapshot, snapshot_key, snapshot_path
+
+# Graph of the worker process, set up by init_worker
+worker_graph = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute distance histograms from many people.")
+    parser.add_argument("directory", help="directory with the CSV files")
+    parser.add_argument("sources", nargs="?", default="-",
+                        help="file with one person id per line "
+                             "(default: standard input)")
+    parser.add_argument("--all", action="store_true",
+                        help="use every person as a source")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="sources handed to a worker at a time")
+    args = parser.parse_args()
+
+    # Loading through the cache makes sure an up-to-date snapshot exists
+    degrees.load_data(args.directory)
+    path = snapshot_path(args.directory)
+    if load_snapshot(path, snapshot_key(args.directory)) is None:
+        sys.exit(f"Could not write the snapshot {path}.")
+    graph = degrees.graph
+
+    if args.all:
+        sources = list(graph.person_ids)
+    elif args.sources == "-":
+        sources = [line.strip() for line in sys.stdin if line.strip()]
+    else:
+        with open(args.sources, encoding="utf-8") as f:
+            sources = [line.strip() for line in f if line.strip()]
+
+    unknown = [source for source in sources
+               if source not in graph.person_index]
+    if unknown:
+        sys.exit(f"Unknown person ids: {', '.join(unknown[:10])}")
+
+    start = time.perf_counter()
+    total = []
+    for source, counts in distance_counts(
+            path, [graph.person_index[source] for source in sources],
+            args.workers, args.chunksize):
+        person_id = graph.person_ids[source]
+        print(json.dumps({
+            "source": person_id,
+            "name": degrees.people[person_id]["name"],
+            "histogram": counts,
+            "eccentricity": len(counts) - 1,
+            "reachable": sum(counts) - 1
+        }))
+        add_counts(total, counts)
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(sources)} sources in {elapsed:.3f}s "
+          f"with {args.workers} workers; total histogram: {total}",
+          file=sys.stderr)
+
+
+def distance_counts(path, sources, workers=None, chunksize=16):
+    """
+    Yields (source, counts) pairs for the dense person indices in sources,
+    where counts is the result of CompactGraph.distance_counts, computing
+    them in a pool of worker processes over the snapshot at path.
+    """
+    chunks = [sources[i:i + chunksize]
+              for i in range(0, len(sources), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(path,)) as executor:
+        for results in executor.map(run_chunk, chunks):
+            yield from results
+
+
+def init_worker(path):
+    """Memory-maps the snapshot graph in a worker process."""
+    global worker_graph
+
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        raise RuntimeError(f"Could not load the snapshot {path}.")
+    # Workers only see dense indices, so the ids are never decoded
+    worker_graph = snapshot.graph(ids=False)
+
+
+def run_chunk(sources):
+    """Returns (source, counts) pairs for a chunk of sources."""
+    return [(source, worker_graph.distance_counts(source))
+            for source in sources]
+
+
+def add_counts(total, counts):
+    """Adds a histogram to a running total, extending it as needed."""
+    for distance, count in enumerate(counts):
+        if distance < len(total):
+            total[distance] += count
+        else:
+            total.append(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Query layer over degrees.shortest_path with a result cache and a landmark
+distance index
+"""
+
+import time
+from collections import OrderedDict, deque
+
+import degrees
+
+
+class DegreesQuery():
+    """
+    Answers shortest path queries on the loaded data, remembering the most
+    recent results in a bounded LRU cache.
+
+    Optionally, breadth-first distances from a few high-degree landmark
+    people are precomputed. For any landmark L, the distance between s and t
+    lies between |d(L, s) - d(L, t)| and d(L, s) + d(L, t), and if only one
+    of s and t can reach L, they are not connected. The lower bounds also
+    prune the search: a person v reached d steps from s is not expanded if
+    d + |d(L, v) - d(L, t)| exceeds the upper bound for some L.
+    """
+
+    def __init__(self, cache_size=1024, landmarks=0):
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        # List of (person_id, distances, parents) triples, where parents maps
+        # every reached person to its (movie_id, person_id) step towards the
+        # landmark. Over a CompactGraph, distances is an array indexed by
+        # person, -1 for unreached people, and parents a pair of arrays of
+        # movies and people, see CompactGraph.search_tree.
+        self.landmarks = []
+        self.graph = None
+        self.index_seconds = 0.0
+        if landmarks:
+            self.build_index(landmarks)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that connect
+        the source to the target, or None if there is no path.
+        """
+        key = (source, target)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            path = self.cache[key]
+        else:
+            self.misses += 1
+            path = self.search(source, target)
+            self.cache[key] = path
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        # Hand out copies, since callers such as print_path reverse paths
+        return None if path is None else list(path)
+
+    def search(self, source, target):
+        """Answers a query that is not cached."""
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+
+        # If a landmark lies on a shortest path, the path is read off the
+        # landmark's search tree
+        lower, upper, landmark = bounds
+        if landmark is not None and lower == upper:
+            return self.landmark_path(source, target, landmark)
+        if landmark is None:
+            return degrees.shortest_path(source, target)
+
+        return degrees.shortest_path(source, target,
+                                     lower_bound=self.lower_bound,
+                                     limit=upper)
+
+    def bounds(self, source, target):
+        """
+        Returns a (lower, upper, landmark) triple bounding the degrees of
+        separation between source and target, where landmark attains the
+        upper bound. upper and landmark are None if no landmark reaches
+        both people.
+
+        Returns None if the landmarks show the two are not connected.
+        """
+        lower = 0
+        upper = None
+        best = None
+        source = self.key(source)
+        target = self.key(target)
+        for landmark in self.landmarks:
+            distances = landmark[1]
+            to_source = distance(distances, source)
+            to_target = distance(distances, target)
+            if (to_source is None) != (to_target is None):
+                return None
+            if to_source is None:
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            if upper is None or to_source + to_target < upper:
+                upper = to_source + to_target
+                best = landmark
+
+        return lower, upper, best
+
+    def lower_bound(self, person, other):
+        """
+        Returns the largest lower bound the landmarks give on the degrees of
+        separation between two people.
+        """
+        lower = 0
+        person = self.key(person)
+        other = self.key(other)
+        for landmark in self.landmarks:
+            distances = landmark[1]
+            to_person = distance(distances, person)
+            to_other = distance(distances, other)
+            if to_person is not None and to_other is not None:
+                lower = max(lower, abs(to_person - to_other))
+        return lower
+
+    def landmark_path(self, source, target, landmark):
+        """
+        Returns the path from source to target through a landmark that
+        reaches both.
+        """
+        if self.graph is not None:
+            return self.compact_landmark_path(source, target, landmark)
+        parents = landmark[2]
+
+        # Follow the search tree from the source up to the landmark
+        path = []
+        person = source
+        while person != landmark[0]:
+            movie, person = parents[person]
+            path.append((movie, person))
+
+        # Follow it from the target up to the landmark and turn it around
+        back = []
+        person = target
+        while person != landmark[0]:
+            movie, parent = parents[person]
+            back.append((movie, person))
+            person = parent
+        back.reverse()
+
+        return path + back
+
+    def compact_landmark_path(self, source, target, landmark):
+        """
+        Returns the path from source to target through a landmark, following
+        the search tree arrays of a CompactGraph.
+        """
+        graph = self.graph
+        root = graph.person_index[landmark[0]]
+        parent_movies, parent_people = landmark[2]
+
+        path = []
+        person = graph.person_index[source]
+        while person != root:
+            movie = parent_movies[person]
+            person = parent_people[person]
+            path.append((graph.movie_ids[movie], graph.person_ids[person]))
+
+        back = []
+        person = graph.person_index[target]
+        while person != root:
+            back.append((graph.movie_ids[parent_movies[person]],
+                         graph.person_ids[person]))
+            person = parent_people[person]
+        back.reverse()
+
+        return path + back
+
+    def key(self, person):
+        """Returns the key of a person in the landmark distances."""
+        if self.graph is None:
+            return person
+        return self.graph.person_index[person]
+
+    def build_index(self, count):
+        """
+        Precomputes distances from the count people who starred in the most
+        movies, over the CompactGraph if one is loaded.
+        """
+        start = time.perf_counter()
+        self.graph = degrees.graph
+        hubs = sorted(degrees.people, key=movie_count, reverse=True)[:count]
+        if self.graph is None:
+            self.landmarks = [(hub, *search_tree(hub)) for hub in hubs]
+        else:
+            self.landmarks = []
+            for hub in hubs:
+                distances, movies, people = self.graph.search_tree(
+                    self.graph.person_index[hub])
+                self.landmarks.append((hub, distances, (movies, people)))
+        self.index_seconds = time.perf_counter() - start
+
+    def stats(self):
+        """Returns cache and index statistics as a dict."""
+        queries = self.hits + self.misses
+        return {
+            "queries": queries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / queries if queries else 0.0,
+            "cached": len(self.cache),
+            "landmarks": [landmark[0] for landmark in self.landmarks],
+            "index_seconds": round(self.index_seconds, 6)
+        }
+
+
+def movie_count(person_id):
+    """Returns the number of movies a person starred in."""
+    if degrees.graph is not None:
+        graph = degrees.graph
+        return graph.degree(graph.person_index[person_id])
+    return len(degrees.people[person_id]["movies"])
+
+
+def distance(distances, key):
+    """
+    Returns the distance of a person from a landmark, or None if the
+    landmark does not reach them.
+    """
+    if isinstance(distances, dict):
+        return distances.get(key)
+    return distances[key] if distances[key] >= 0 else None
+
+
+def search_tree(root):
+    """
+    Runs a breadth-first search from root and returns the distance of every
+    reached person and their (movie_id, person_id) step towards root.
+    """
+    distances = {root: 0}
+    parents = {}
+    queue = deque([root])
+    while queue:
+        person = queue.popleft()
+        for movie, costar in degrees.neighbors_for_person(person):
+            if costar not in distances:
+                distances[costar] = distances[person] + 1
+                parents[costar] = (movie, person)
+                queue.append(costar)
+
+    return distances, parents
@@ -1,3 +1,7 @@
+import time
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -49,3 +53,167 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier(StackFrontier):
+    """
+    Stack frontier backed by a deque, with an index from states to the nodes
+    holding them, so that adding, removing and looking up states take
+    constant time.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.index = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        if node.state in self.index:
+            self.index[node.state].append(node)
+        else:
+            self.index[node.state] = deque([node])
+
+    def contains_state(self, state):
+        return state in self.index
+
+    def get_node_with_state(self, state):
+        nodes = self.index.get(state)
+        if nodes:
+            return nodes[0]
+        return None
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            # The removed node is the newest one with its state
+            nodes = self.index[node.state]
+            nodes.pop()
+            if not nodes:
+                del self.index[node.state]
+            return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            # The removed node is the oldest one with its state
+            nodes = self.index[node.state]
+            nodes.popleft()
+            if not nodes:
+                del self.index[node.state]
+            return node
+
+
+class DisjointSet():
+    """
+    Union-find structure over the integers 0 to size - 1, with union by
+    size and path halving.
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+    def labels(self):
+        """Returns the representative of every item's set, in item order."""
+        return [self.find(item) for item in range(len(self.parent))]
+
+
+class SearchStats():
+    """
+    Counts the work done by a search and times its phases.
+
+    If a callback is given, it is called with the stats at most once every
+    interval seconds while the search runs, and once more when it stops.
+    """
+
+    def __init__(self, callback=None, interval=0.5):
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.explored = 0
+        self.phases = {}
+        self.callback = callback
+        self.interval = interval
+        self.phase = None
+        self.phase_start = None
+        self.last_report = None
+
+    def start(self, phase):
+        """Ends the running phase, if any, and starts timing a new one."""
+        now = time.perf_counter()
+        self.end_phase(now)
+        self.phase = phase
+        self.phase_start = now
+        if self.last_report is None:
+            self.last_report = now
+
+    def stop(self):
+        """Ends the running phase and reports the final stats."""
+        self.end_phase(time.perf_counter())
+        if self.callback is not None:
+            self.callback(self)
+
+    def end_phase(self, now):
+        if self.phase is not None:
+            self.phases[self.phase] = (self.phases.get(self.phase, 0.0)
+                                       + now - self.phase_start)
+            self.phase = None
+
+    def expanded(self, frontier_size, explored_size):
+        """
+        Records the expansion of a node, given the sizes of the frontier and
+        of the explored set afterwards.
+        """
+        self.nodes_expanded += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        self.explored = explored_size
+
+        if self.callback is not None:
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.callback(self)
+
+    def running(self):
+        return self.phase is not None
+
+    def elapsed(self):
+        """Returns the time spent in all phases so far."""
+        elapsed = sum(self.phases.values())
+        if self.phase is not None:
+            elapsed += time.perf_counter() - self.phase_start
+        return elapsed
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "peak_frontier": self.peak_frontier,
+            "explored": self.explored,
+            "elapsed": round(self.elapsed(), 6),
+            "phases": {phase: round(seconds, 6)
+                       for phase, seconds in self.phases.items()}
+        }
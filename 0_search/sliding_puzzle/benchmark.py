@@ -0,0 +1,248 @@
+"""
+Benchmark of the sliding puzzle solvers
+
+Generates seeded sets of solvable boards at known optimal depths, solves
+every board with every strategy without any terminal output, and writes wall
+time, nodes expanded, peak memory and solution length of every run as CSV
+or JSON lines.
+
+Unless strategies are given, boards with pattern databases by default (see
+sliding_puzzle.default_heuristic), such as 4x4 boards, skip the optimal
+strategies using linear conflict, which take minutes on them.
+"""
+
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import pattern_db
+import sliding_puzzle as sp
+import util as ut
+
+# Strategies by name, as (method, heuristic) arguments of sliding_puzzle.path
+STRATEGIES = {
+    "greedy": ("greedy", "linear_conflict"),
+    "astar": ("astar", "linear_conflict"),
+    "idastar": ("idastar", "linear_conflict"),
+    "astar-pdb": ("astar", "pdb"),
+    "idastar-pdb": ("idastar", "pdb")
+}
+
+# Boards with at most this many cells get their depths from a complete
+# breadth-first search, larger ones from solving random walks optimally
+EXHAUSTIVE_CELLS = 9
+
+FIELDS = ["size", "instance", "depth", "strategy", "solved", "length",
+          "seconds", "nodes_expanded", "peak_frontier", "peak_memory"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the sliding puzzle solvers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3],
+                        help="board sizes to generate (default: 3)")
+    parser.add_argument("--depths", type=int, nargs="+",
+                        default=[10, 16, 22],
+                        help="optimal solution lengths of the boards")
+    parser.add_argument("--count", type=int, default=5,
+                        help="boards per size and depth")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES),
+                        help="default: all, without astar and idastar on "
+                             "boards solved with pattern databases by "
+                             "default")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the extra run measuring peak memory")
+    parser.add_argument("--partition", default="default",
+                        help="pattern databases of the pdb strategies, a "
+                             "name such as 663 or tile groups such as "
+                             "1,2,4,5/3,6,7,8")
+    parser.add_argument("--pdb-report", action="store_true",
+                        help="write build time, size and lookup rate of the "
+                             "pattern databases to standard error")
+    args = parser.parse_args()
+
+    strategies = {size: args.strategies or default_strategies(size)
+                  for size in args.sizes}
+    partitions = {}
+    for size in args.sizes:
+        if any(STRATEGIES[strategy][1] == "pdb"
+               for strategy in strategies[size]):
+            try:
+                partitions[size] = pattern_db.parse_partition(
+                    args.partition, size, size)
+            except ValueError as error:
+                sys.exit(f"{error}.")
+
+    output = (open(args.output, "w", newline="", encoding="utf-8")
+              if args.output else sys.stdout)
+    if args.format == "csv":
+        writer = csv.DictWriter(output, FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            print(json.dumps(row), file=output)
+
+    try:
+        for size in args.sizes:
+            boards = instances(size, args.depths, args.count, args.seed)
+            for number, (depth, board) in enumerate(boards):
+                for strategy in strategies[size]:
+                    row = {"size": size, "instance": number,
+                           "depth": depth, "strategy": strategy}
+                    row.update(run(board, strategy, not args.no_memory,
+                                   partitions.get(size)))
+                    write(row)
+                    output.flush()
+    finally:
+        if args.output:
+            output.close()
+
+    if args.pdb_report:
+        for size, partition in sorted(partitions.items()):
+            database = pattern_db.load(ut.pack(sp.goal_state(size)), size,
+                                       size, partition)
+            print(json.dumps({"shape": f"{size}x{size}",
+                              **database.report()}), file=sys.stderr)
+
+
+def default_strategies(size):
+    """Return the strategies boards of a size are benchmarked with."""
+    if sp.default_heuristic(size, size) == "pdb":
+        return [strategy for strategy, (method, heuristic)
+                in STRATEGIES.items()
+                if method == "greedy" or heuristic == "pdb"]
+    return list(STRATEGIES)
+
+
+def run(board, strategy, memory=True, partition=None):
+    """
+    Solve a board with a strategy and return the measurements as a dict.
+    Strategies using pattern databases use those of partition, by default
+    the one in pattern_db.PARTITIONS.
+
+    Peak memory is measured by tracemalloc in a second run, so that tracing
+    does not distort the timing of the first, nor the lookup counts of the
+    pattern databases.
+    """
+    method, heuristic = STRATEGIES[strategy]
+    goal = sp.goal_state(len(board))
+    database = None
+    if heuristic == "pdb":
+        # Build or map the databases before the clock starts
+        database = pattern_db.load(ut.pack(goal), len(board), len(board[0]),
+                                   partition)
+
+    stats = ut.SearchStats()
+    start = time.perf_counter()
+    solution = sp.path(board, goal, stats, method=method,
+                       heuristic=heuristic, partition=partition)
+    seconds = time.perf_counter() - start
+
+    peak_memory = None
+    if memory:
+        if database is not None:
+            counts = database.lookups, database.lookup_seconds
+        tracemalloc.start()
+        sp.path(board, goal, ut.SearchStats(), method=method,
+                heuristic=heuristic, partition=partition)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if database is not None:
+            database.lookups, database.lookup_seconds = counts
+
+    return {
+        "solved": solution is not None,
+        "length": len(solution) - 1 if solution is not None else None,
+        "seconds": round(seconds, 6),
+        "nodes_expanded": stats.nodes_expanded,
+        "peak_frontier": stats.peak_frontier,
+        "peak_memory": peak_memory
+    }
+
+
+def instances(size, depths, count, seed):
+    """
+    Return count (depth, board) pairs for every depth, boards of the given
+    size whose shortest solution has exactly depth moves. The same seed
+    always gives the same boards.
+    """
+    rng = random.Random(f"{seed}-{size}")
+    if size * size <= EXHAUSTIVE_CELLS:
+        by_depth = boards_by_depth(size)
+        boards = []
+        for depth in depths:
+            if depth not in by_depth:
+                raise ValueError(f"No {size}x{size} board at depth {depth}")
+            codes = rng.sample(by_depth[depth],
+                               min(count, len(by_depth[depth])))
+            boards += [(depth, ut.unpack(code, size, size))
+                       for code in codes]
+        return boards
+
+    return [(depth, walk_to_depth(size, depth, rng))
+            for depth in depths for _ in range(count)]
+
+
+def boards_by_depth(size):
+    """
+    Return a dict mapping every optimal depth to the packed boards of the
+    given size at that depth, found by breadth-first search from the goal.
+    """
+    cells = size * size
+    goal = ut.pack(sp.goal_state(size))
+    depths = {goal: 0}
+    queue = deque([(goal, cells - 1)])
+    while queue:
+        code, blank = queue.popleft()
+        for cell in ut.adjacent_cells(blank, size, size):
+            child = ut.move_tile(code, blank, cell, cells)
+            if child not in depths:
+                depths[child] = depths[code] + 1
+                queue.append((child, cell))
+
+    by_depth = {}
+    for code, depth in depths.items():
+        by_depth.setdefault(depth, []).append(code)
+    for codes in by_depth.values():
+        codes.sort()
+    return by_depth
+
+
+def walk_to_depth(size, depth, rng, attempts=100):
+    """
+    Return a board whose shortest solution has exactly depth moves, made by
+    random walks from the goal whose length is adjusted until an optimal
+    solver agrees. The lookups of the solver are not counted by the pattern
+    databases, which only count those of the benchmarked runs.
+    """
+    goal = sp.goal_state(size)
+    database = pattern_db.load(ut.pack(goal), size, size)
+    counts = database.lookups, database.lookup_seconds
+    moves = depth
+    try:
+        for _ in range(attempts):
+            board = sp.random_walk(goal, moves, rng)
+            solution = sp.path(board, goal, ut.SearchStats(),
+                               method="idastar", heuristic="pdb")
+            optimal = len(solution) - 1
+            if optimal == depth:
+                return board
+            # Walks fold back on themselves, so they are usually too short
+            moves = max(depth, moves + (depth - optimal) // 2 + 1)
+    finally:
+        database.lookups, database.lookup_seconds = counts
+
+    raise ValueError(f"No {size}x{size} board at depth {depth} found")
+
+
+if __name__ == "__main__":
+    main()
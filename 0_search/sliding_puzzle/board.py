@@ -6,29 +6,114 @@ import util as ut
 
 
 class Board:
-    def __init__(self, size):
-        def get_solved_state():
-            """Return the solved state of the board."""
-            solved_board = []
-            tiles = list(range(1, size*size + 1))
-            tiles[-1] = None
-            while(tiles != []):
-                solved_board.append(tiles[0:size])  # Append a row to the solved board
-                tiles = tiles[size:]  # Remove tiles already in the board
-
-            return solved_board
-
-        self.solved_state = get_solved_state()
-        self.state = self.solved_state
-
-    def print_board():
+    """
+    Sliding puzzle board of any number of rows and columns.
+
+    Cells are numbered row by row. Everything that depends only on the shape
+    of the board, such as the cells next to each cell, is computed once, so
+    generating moves comes down to table lookups. The board keeps track of
+    its empty cell, so it never has to be searched for.
+
+    The board also works as a move generator for packed boards (see
+    util.pack), used by the solvers.
+    """
+
+    def __init__(self, rows, columns=None, state=None):
+        if columns is None:
+            columns = rows
+        self.rows = rows
+        self.columns = columns
+        self.cells = rows * columns
+        self.bits = ut.tile_bits(self.cells)
+        self.mask = (1 << self.bits) - 1
+
+        # neighbors[cell] are the cells next to cell
+        self.neighbors = [tuple(ut.adjacent_cells(cell, rows, columns))
+                          for cell in range(self.cells)]
+
+        # move_table[blank] holds a (cell, shift, blank shift) triple for
+        # every tile that can move into the empty cell blank of a packed
+        # board, the shifts being the bit offsets of the two cells
+        self.move_table = [
+            tuple((cell, cell * self.bits, blank * self.bits)
+                  for cell in self.neighbors[blank])
+            for blank in range(self.cells)
+        ]
+
+        self.solved_state = goal_state(rows, columns)
+        self.goal = ut.pack(self.solved_state)
+
+        if state is None:
+            state = self.solved_state
+        self.state = [list(row) for row in state]
+        self.blank = ut.blank_cell(ut.pack(self.state), self.cells)
+
+    def moves(self, code, blank):
+        """
+        Yield (cell, child) pairs for every tile at cell that can move into
+        the empty cell blank of a packed board, child being the resulting
+        packed board. After the move, cell is the empty one.
+        """
+        mask = self.mask
+        for cell, shift, blank_shift in self.move_table[blank]:
+            tile = (code >> shift) & mask
+            yield cell, code ^ (tile << shift) ^ (tile << blank_shift)
+
+    def move_tile(self, code, blank, cell):
+        """
+        Return the packed board after moving the tile at cell into the
+        empty cell blank.
+        """
+        shift = cell * self.bits
+        tile = (code >> shift) & self.mask
+        return code ^ (tile << shift) ^ (tile << (blank * self.bits))
+
+    def empty_tile_pos(self):
+        """Return the (row, column) position of the empty tile."""
+        return divmod(self.blank, self.columns)
+
+    def actions(self):
+        """Return the (row, column) positions of tiles that can move."""
+        return [divmod(cell, self.columns)
+                for cell in self.neighbors[self.blank]]
+
+    def move(self, action):
+        """Move the tile at the (row, column) position action."""
+        row, column = action
+        cell = row * self.columns + column
+        if cell not in self.neighbors[self.blank]:
+            raise ValueError("Invalid move: " + str(action))
+
+        blank_row, blank_column = divmod(self.blank, self.columns)
+        self.state[blank_row][blank_column] = self.state[row][column]
+        self.state[row][column] = None
+        self.blank = cell
+
+    def solved(self):
+        return self.state == self.solved_state
+
+    def print_board(self):
         """Prints the present state of the board."""
         for row in self.state:
             for tile in row:
                 if not tile:
-                    print(" ", end="")
+                    print("[    ] ", end="")
+                elif tile < 10:
+                    print("[ " + str(tile) + "  ] ", end="")
                 else:
-                    print("[ " + str(tile) + " ]", end="")
+                    print("[ " + str(tile) + " ] ", end="")
+            print("\n")
+
+
+def goal_state(rows, columns=None):
+    """
+    Return the solved board of the given shape, square by default, with the
+    tiles in ascending order and the empty cell last.
+    """
+    if columns is None:
+        columns = rows
+    tiles = list(range(1, rows * columns)) + [None]
+    return [tiles[i:i + columns] for i in range(0, rows * columns, columns)]
 
 
 def main():
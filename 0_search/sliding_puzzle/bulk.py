@@ -0,0 +1,206 @@
+"""
+Solves many sliding puzzles in parallel
+
+Boards are read from a file, one per line, with rows separated by "/" and
+tiles by spaces or commas, the empty cell written as 0 or _:
+
+    1 2 3/4 5 6/7 _ 8
+
+Blank lines and lines starting with # are skipped. Every board is solved by
+a pool of worker processes and one JSON line is written per board as soon
+as it is solved, so results come out in completion order. Pattern databases
+are memory-mapped by every worker, so they are shared through the page
+cache instead of being copied into each process.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pattern_db
+import sliding_puzzle as sp
+import util as ut
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve sliding puzzles from a file in parallel.")
+    parser.add_argument("boards", nargs="?", default="-",
+                        help="file with one board per line "
+                             "(default: standard input)")
+    parser.add_argument("--method", choices=sp.METHODS, default="idastar")
+    parser.add_argument("--heuristic", choices=["linear_conflict", "pdb"],
+                        help="default: pdb on boards of 4x4 and larger with "
+                             "a default partition, linear_conflict on "
+                             "others (see sliding_puzzle.default_heuristic)")
+    parser.add_argument("--partition", default="default",
+                        help="pattern databases to use, a name such as 663 "
+                             "or tile groups such as 1,2,4,5/3,6,7,8")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--pdb-report", action="store_true",
+                        help="write build time, size and lookup rate of the "
+                             "pattern databases to standard error")
+    args = parser.parse_args()
+
+    if args.boards == "-":
+        boards = read_boards(sys.stdin)
+    else:
+        with open(args.boards, encoding="utf-8") as f:
+            boards = read_boards(f)
+
+    # Build missing databases once, before the workers map them
+    partitions = {}
+    for rows, columns in set((len(board), len(board[0]))
+                             for _, board in boards):
+        if (args.heuristic or sp.default_heuristic(rows, columns)) != "pdb":
+            continue
+        try:
+            partitions[(rows, columns)] = pattern_db.parse_partition(
+                args.partition, rows, columns)
+        except ValueError as error:
+            sys.exit(f"{error}.")
+    init_worker(partitions)
+
+    # Databases of the process by line number, to count worker lookups in
+    databases = {}
+    for number, board in boards:
+        shape = (len(board), len(board[0]))
+        if shape in partitions:
+            databases[number] = pattern_db.load(
+                ut.pack(sp.goal_state(*shape)), *shape, partitions[shape])
+
+    start = time.perf_counter()
+    solved = 0
+    for row in solve_all(boards, args.method, args.heuristic, args.workers,
+                         partitions):
+        if "pdb_lookups" in row:
+            database = databases[row["line"]]
+            database.lookups += row.pop("pdb_lookups")
+            database.lookup_seconds += row.pop("pdb_lookup_seconds")
+        print(json.dumps(row), flush=True)
+        solved += row["solved"]
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(boards)} boards ({solved} solved) in {elapsed:.3f}s "
+          f"with {args.workers} workers, "
+          f"{len(boards) / elapsed if elapsed else 0:.1f} boards/s",
+          file=sys.stderr)
+    if args.pdb_report:
+        for (rows, columns), partition in sorted(partitions.items()):
+            database = pattern_db.load(ut.pack(sp.goal_state(rows, columns)),
+                                       rows, columns, partition)
+            print(json.dumps({"shape": f"{rows}x{columns}",
+                              **database.report()}), file=sys.stderr)
+
+
+def read_boards(lines):
+    """
+    Return a list of (line number, board) pairs for the boards in lines,
+    exiting with a message on the first one that is not a valid board.
+    """
+    boards = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            boards.append((number, parse_board(line)))
+        except ValueError as error:
+            sys.exit(f"Line {number}: {error}")
+    return boards
+
+
+def parse_board(text):
+    """Return the board written in text, see the module docstring."""
+    board = []
+    for row in text.split("/"):
+        board.append([None if tile in ["0", "_"] else int(tile)
+                      for tile in row.replace(",", " ").split()])
+
+    cells = len(board) * len(board[0])
+    if any(len(row) != len(board[0]) for row in board):
+        raise ValueError("rows are not of the same length")
+    tiles = sorted(tile or 0 for row in board for tile in row)
+    if tiles != list(range(cells)):
+        raise ValueError(f"tiles are not 1 to {cells - 1} "
+                         "and one empty cell")
+    return board
+
+
+def solve_all(boards, method, heuristic, workers, partitions=None):
+    """
+    Solve (line number, board) pairs in a pool of workers and yield the
+    result of every board as soon as it is ready. If heuristic is None,
+    every board is solved with the default_heuristic of its shape.
+    partitions maps (rows, columns) board shapes to the partitions of their
+    pattern databases, which the workers map when they start.
+    """
+    partitions = partitions or {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(partitions,)) as executor:
+        futures = []
+        for number, board in boards:
+            shape = (len(board), len(board[0]))
+            futures.append(executor.submit(
+                solve, number, board, method,
+                heuristic or sp.default_heuristic(*shape),
+                partitions.get(shape)))
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def init_worker(partitions):
+    """
+    Map the pattern databases of the partitions, by board shape, up front.
+    """
+    for (rows, columns), partition in partitions.items():
+        pattern_db.load(ut.pack(sp.goal_state(rows, columns)), rows,
+                        columns, partition)
+
+
+def solve(number, board, method, heuristic, partition=None):
+    """
+    Solve a board in a worker and return its result as a dict. With pattern
+    databases, the lookups the search made and the seconds they took are
+    included as pdb_lookups and pdb_lookup_seconds.
+    """
+    stats = ut.SearchStats()
+    goal = sp.goal_state(len(board), len(board[0]))
+    if heuristic == "pdb":
+        database = pattern_db.load(ut.pack(goal), len(board), len(board[0]),
+                                   partition)
+        lookups = database.lookups
+        lookup_seconds = database.lookup_seconds
+    solution = sp.path(board, goal, stats, method=method,
+                       heuristic=heuristic, partition=partition)
+    row = {
+        "line": number,
+        "solved": solution is not None,
+        "length": len(solution) - 1 if solution is not None else None,
+        "moves": moved_tiles(solution) if solution is not None else None,
+        "seconds": round(stats.elapsed(), 6),
+        "nodes_expanded": stats.nodes_expanded,
+        "peak_frontier": stats.peak_frontier,
+        "worker": os.getpid()
+    }
+    if heuristic == "pdb":
+        row["pdb_lookups"] = database.lookups - lookups
+        row["pdb_lookup_seconds"] = database.lookup_seconds - lookup_seconds
+    return row
+
+
+def moved_tiles(solution):
+    """Return the tile moved by each step of a solution."""
+    moves = []
+    for board, following in zip(solution, solution[1:]):
+        row, column = sp.empty_tile_pos(following)
+        moves.append(board[row][column])
+    return moves
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Additive pattern databases for the sliding puzzle
+
+The tiles are split into disjoint groups (patterns). For every placement of
+a group's tiles, its database stores the fewest moves of those tiles needed
+to bring them to their goal cells, with all other tiles ignored. Since only
+moves of the group's own tiles are counted, the values of all groups can be
+added up and the sum is still an admissible estimate.
+
+Databases are built by a breadth-first search backwards from the goal and
+stored on disk as one byte per placement, so they can be memory-mapped.
+The bytes follow MAGIC and the seconds the build took, a little-endian
+double, so the build time is still known when a cached file is mapped.
+"""
+
+import mmap
+import os
+import struct
+import time
+from collections import deque
+
+import util as ut
+
+# First bytes of every database file, bumped whenever the layout changes
+MAGIC = b"SPPDB002"
+
+# Layout of the build time following MAGIC
+HEADER = struct.Struct("<d")
+
+# Directory the databases are cached in
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "databases")
+
+# Value of placements the search has not reached
+UNREACHED = 255
+
+# Default partitions of the tiles by board shape. Building a database takes
+# time and space proportional to cells ** len(pattern): on 4x4 boards, the
+# 5-5-5 partition builds in under a minute into 1 MB per database, while the
+# stronger 6-6-3 partition of PARTITIONS_663 takes several minutes and
+# 300 MB of memory per 6 tile database, which then takes 16 MB on disk.
+PARTITIONS = {
+    (2, 2): [[1, 2, 3]],
+    (3, 3): [[1, 2, 4, 5], [3, 6, 7, 8]],
+    (4, 4): [[1, 2, 3, 5, 6], [4, 7, 8, 11, 12], [9, 10, 13, 14, 15]]
+}
+
+PARTITIONS_663 = {
+    (4, 4): [[1, 5, 6, 9, 10, 13], [7, 8, 11, 12, 14, 15], [2, 3, 4]]
+}
+
+# Partitions by the names parse_partition accepts
+NAMED_PARTITIONS = {
+    "default": PARTITIONS,
+    "663": PARTITIONS_663
+}
+
+# Databases loaded so far, by shape, goal and partition
+loaded = {}
+
+
+class PatternDatabase():
+    """
+    Database of a single pattern. The placement of the pattern's tiles at
+    cells p0, p1, ... is stored at index p0 + p1 * cells + p2 * cells ** 2 +
+    ..., which lets a move update the index with a single addition.
+    """
+
+    def __init__(self, tiles, cells, table, build_seconds=0.0):
+        self.tiles = tiles
+        self.cells = cells
+        self.table = table
+        self.build_seconds = build_seconds
+        self.weights = [cells ** i for i in range(len(tiles))]
+
+    def index(self, positions):
+        """Return the index of a placement, positions mapping tile to cell."""
+        index = 0
+        for tile, weight in zip(self.tiles, self.weights):
+            index += positions[tile] * weight
+        return index
+
+    def lookup(self, positions):
+        return self.table[self.index(positions)]
+
+
+class AdditivePatternDatabase():
+    """
+    Heuristic adding up the databases of a partition of the tiles, which
+    also keeps count of its lookups.
+    """
+
+    def __init__(self, databases, load_seconds=0.0):
+        self.databases = databases
+        self.load_seconds = load_seconds
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+
+    def estimate(self, tiles):
+        """
+        Return the estimated number of moves left for the tiles of a board,
+        given as a flat list as returned by util.tiles.
+        """
+        start = time.perf_counter()
+        positions = [0] * len(tiles)
+        for cell, tile in enumerate(tiles):
+            positions[tile] = cell
+        estimate = 0
+        for database in self.databases:
+            estimate += database.lookup(positions)
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        return estimate
+
+    def report(self):
+        """Return build time, size and lookup rate as a dict."""
+        return {
+            "patterns": [database.tiles for database in self.databases],
+            "bytes": sum(len(database.table) for database in self.databases),
+            "build_seconds": round(sum(database.build_seconds
+                                       for database in self.databases), 3),
+            "load_seconds": round(self.load_seconds, 6),
+            "lookups": self.lookups,
+            "lookups_per_second": (round(self.lookups / self.lookup_seconds)
+                                   if self.lookup_seconds else None)
+        }
+
+
+def parse_partition(text, rows, columns):
+    """
+    Return the partition for a board shape written in text, either a name
+    in NAMED_PARTITIONS or groups of tiles separated by "/", with the tiles
+    of a group separated by commas, such as "1,2,4,5/3,6,7,8".
+
+    Raise ValueError if text is not a valid partition for the shape.
+    """
+    if text in NAMED_PARTITIONS:
+        if (rows, columns) not in NAMED_PARTITIONS[text]:
+            raise ValueError(f"No {text} partition for {rows}x{columns} "
+                             "boards")
+        return NAMED_PARTITIONS[text][(rows, columns)]
+
+    try:
+        partition = [[int(tile) for tile in group.split(",")]
+                     for group in text.split("/")]
+    except ValueError:
+        raise ValueError(f"Not a partition: {text}")
+    check_partition(partition, rows * columns)
+    return partition
+
+
+def check_partition(partition, cells):
+    """
+    Raise ValueError unless partition is a list of disjoint groups of tiles
+    of a board with the given number of cells. Tiles in no group are simply
+    not counted.
+    """
+    tiles = [tile for group in partition for tile in group]
+    if any(not 0 < tile < cells for tile in tiles):
+        raise ValueError(f"Tiles must be between 1 and {cells - 1}")
+    if len(set(tiles)) != len(tiles):
+        raise ValueError("A tile is in more than one group")
+
+
+def build(tiles, goal, rows, columns):
+    """
+    Return the PatternDatabase of the given tiles for a packed goal board.
+
+    A search state is the placement of the pattern's tiles together with the
+    empty cell. Moving the empty cell over other tiles costs nothing and
+    moving it over a pattern tile costs one move, so the search is a
+    breadth-first search on a deque, with free moves at the front.
+    """
+    start = time.perf_counter()
+    cells = rows * columns
+    weights = [cells ** i for i in range(len(tiles))]
+    goal_cells = ut.goal_cells(goal, cells)
+    adjacent = [ut.adjacent_cells(cell, rows, columns)
+                for cell in range(cells)]
+
+    # Fewest pattern moves by placement and empty cell, in one flat array
+    size = cells ** len(tiles)
+    distances = bytearray([UNREACHED]) * (size * cells)
+    table = bytearray([UNREACHED]) * size
+
+    index = sum(goal_cells[tile] * weight
+                for tile, weight in zip(tiles, weights))
+    state = index * cells + goal_cells[0]
+    distances[state] = 0
+    queue = deque([state])
+    while queue:
+        state = queue.popleft()
+        index, blank = divmod(state, cells)
+        distance = distances[state]
+        if distance < table[index]:
+            table[index] = distance
+
+        # Find which cells the pattern tiles occupy
+        occupied = {}
+        rest = index
+        for weight in weights:
+            rest, cell = divmod(rest, cells)
+            occupied[cell] = weight
+
+        for cell in adjacent[blank]:
+            if cell in occupied:
+                # The pattern tile at cell moves into the empty cell
+                child = ((index + (blank - cell) * occupied[cell]) * cells
+                         + cell)
+                if distances[child] > distance + 1:
+                    distances[child] = distance + 1
+                    queue.append(child)
+            else:
+                child = index * cells + cell
+                if distances[child] > distance:
+                    distances[child] = distance
+                    queue.appendleft(child)
+
+    return PatternDatabase(tiles, cells, table,
+                           time.perf_counter() - start)
+
+
+def database_path(tiles, goal, rows, columns, directory=CACHE_DIRECTORY):
+    """Return the path of the cached database file of a pattern."""
+    name = (f"{rows}x{columns}-{goal:x}-"
+            + "-".join(str(tile) for tile in tiles) + ".pdb")
+    return os.path.join(directory, name)
+
+
+def save(database, path):
+    """Write a database to a file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(database.build_seconds))
+        f.write(database.table)
+    os.replace(temporary, path)
+
+
+def open_database(tiles, cells, path):
+    """
+    Memory-map a database file and return it, or None if there is no valid
+    file at path.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    offset = len(MAGIC) + HEADER.size
+    if (mapping[:len(MAGIC)] != MAGIC
+            or len(mapping) != offset + cells ** len(tiles)):
+        mapping.close()
+        return None
+
+    build_seconds, = HEADER.unpack_from(mapping, len(MAGIC))
+    table = memoryview(mapping)[offset:]
+    return PatternDatabase(tiles, cells, table, build_seconds)
+
+
+def load(goal, rows, columns, partition=None, directory=CACHE_DIRECTORY):
+    """
+    Return the AdditivePatternDatabase for a packed goal board, memory-mapping
+    the cached databases of the partition and building missing ones.
+
+    The partition defaults to the one in PARTITIONS for the board shape.
+    """
+    if partition is None:
+        if (rows, columns) not in PARTITIONS:
+            raise ValueError(f"No default partition for {rows}x{columns} "
+                             "boards")
+        partition = PARTITIONS[(rows, columns)]
+    else:
+        check_partition(partition, rows * columns)
+    key = (rows, columns, goal, tuple(tuple(tiles) for tiles in partition),
+           directory)
+    if key in loaded:
+        return loaded[key]
+
+    start = time.perf_counter()
+    cells = rows * columns
+    databases = []
+    for tiles in partition:
+        path = database_path(tiles, goal, rows, columns, directory)
+        database = open_database(tiles, cells, path)
+        if database is None:
+            database = build(tiles, goal, rows, columns)
+            try:
+                save(database, path)
+            except OSError:
+                pass
+        databases.append(database)
+
+    loaded[key] = AdditivePatternDatabase(databases,
+                                          time.perf_counter() - start)
+    return loaded[key]
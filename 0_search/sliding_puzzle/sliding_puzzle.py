@@ -6,17 +6,32 @@ import random
 import copy
 import time
 import os
+import pattern_db
 import util as ut
+from board import Board, goal_state
 
 
 def main():
-    board_size = input("Enter board size: ")
+    board_size = input("Enter board size (e.g. 3 or 3x4): ")
+    rows, _, columns = board_size.partition("x")
+    rows = int(rows)
+    columns = int(columns) if columns else rows
     play_prompt = input("Do you want to play (y/n): ")
 
     if play_prompt == 'y':
-        play(int(board_size))
+        play(rows, columns)
     else:
-        p = path(initial_state(int(board_size)), goal_state(int(board_size)))
+        method = input("Solver (" + "/".join(METHODS) + ", default greedy): ")
+        heuristic = "linear_conflict"
+        if method in ["astar", "idastar"]:
+            default = default_heuristic(rows, columns)
+            answer = input("Use pattern databases (y/n, default "
+                           + ("y" if default == "pdb" else "n") + "): ")
+            heuristic = {"y": "pdb", "n": "linear_conflict"}.get(answer,
+                                                                 default)
+        p = path(initial_state(rows, columns=columns),
+                 goal_state(rows, columns),
+                 method=method or "greedy", heuristic=heuristic)
         # p = path([[1,2],[3,None]], goal_state(2))
         if p:
             play_solution(p)
@@ -24,21 +39,21 @@ def main():
             print("Sorry, but the puzzle has no solution!")
 
 
-def play(board_size):
+def play(rows, columns=None):
     os.system('clear')
-    board = initial_state(board_size)
+    board = Board(rows, columns, initial_state(rows, True, columns=columns))
     valid_move = True
 
     while True:
         print("Use arrows to move tiles, or press 'qqq' to quit: ")
         print("\n")
-        print_board(board)
+        board.print_board()
 
         if not valid_move:
             print("This was not a valid move!")
 
-        empty_tile = empty_tile_pos(board)
-        valid_moves = actions(board)
+        empty_tile = board.empty_tile_pos()
+        valid_moves = board.actions()
         ui_mapping = {}
 
         for move in valid_moves:
@@ -80,26 +95,41 @@ def play(board_size):
                 valid_move = False
                 os.system('clear')
         else:
-            board = result(board, ui_mapping[key])
+            board.move(ui_mapping[key])
             os.system('clear')
             valid_move = True
 
-        if board == goal_state(board_size):
-            print_board(board)
+        if board.solved():
+            board.print_board()
             print("Congratulations, you have won!")
             return
 
 
-def initial_state(size):
-    """Return board with tiles shuffled randomly"""
-    tiles = list(range(1, size*size))
+def initial_state(size, solvable=False, moves=None, columns=None):
+    """
+    Return board with tiles shuffled randomly, with size rows and as many
+    columns unless columns is given.
+
+    Half of all such boards cannot be solved. If solvable is True, the board
+    is instead shuffled by a random walk of the given number of moves from
+    the goal state (by default 20 moves per tile), so it can always be
+    solved.
+    """
+    if columns is None:
+        columns = size
+    if solvable:
+        return random_walk(goal_state(size, columns),
+                           moves if moves is not None
+                           else 20 * size * columns)
+
+    tiles = list(range(1, size*columns))
     tiles.append(None)
     board = []
 
     # Distribute tiles randomly accross the board
     for i in range(1, size + 1):
         row = []
-        for j in range(1, size + 1):
+        for j in range(1, columns + 1):
             tile = random.choice(tiles)
             row.append(tile)
             tiles.remove(tile)
@@ -108,20 +138,51 @@ def initial_state(size):
     return board
 
 
-def goal_state(size):
-    """Return representation of solution for given size of board."""
-    tiles = list(range(1, size*size))
-    tiles.append(None)
-    board = []
+def random_walk(board, moves, rng=random):
+    """
+    Return the board after making the given number of random moves, chosen
+    by rng, a random.Random or the random module.
+    """
+    board = Board(len(board), len(board[0]), board)
+    code = ut.pack(board.state)
+    blank = board.blank
+    for _ in range(moves):
+        cell = rng.choice(board.neighbors[blank])
+        code = board.move_tile(code, blank, cell)
+        blank = cell
 
-    # Distribute tiles accross the board in ascending order
-    for i in range(1, size + 1):
-        row = []
-        for j in range(1, size + 1):
-            row.append(tiles.pop(0))
-        board.append(row)
+    return ut.unpack(code, board.rows, board.columns)
 
-    return board
+
+def is_solvable(board, goal):
+    """
+    Return True if the goal can be reached from board.
+
+    Every move swaps the empty tile with another one, which changes the
+    parity of the permutation of the tiles, and moves the empty tile by one
+    cell, which changes the parity of its distance from its goal cell. So
+    the two parities always agree on a solvable board. The parity of the
+    permutation is that of its number of inversions.
+    """
+    columns = len(board[0])
+    goal_cells = {}
+    for cell, tile in enumerate(t for row in goal for t in row):
+        goal_cells[tile] = cell
+
+    # The goal cells of the tiles, read row by row
+    order = [goal_cells[tile] for row in board for tile in row]
+    inversions = 0
+    for i in range(len(order)):
+        for j in range(i + 1, len(order)):
+            if order[i] > order[j]:
+                inversions += 1
+
+    goal_blank = goal_cells[None]
+    blank = order.index(goal_blank)
+    blank_distance = (abs(blank // columns - goal_blank // columns)
+                      + abs(blank % columns - goal_blank % columns))
+
+    return (inversions + blank_distance) % 2 == 0
 
 
 def print_board(board):
@@ -156,7 +217,7 @@ def actions(board):
         adjecent_tiles.append((empty_tile[0] + 1, empty_tile[1]))
     if empty_tile[1] != 0:  # Leftmost column check
         adjecent_tiles.append((empty_tile[0], empty_tile[1] - 1))
-    if (empty_tile[1] + 1) != len(board):  # Rightmost column check
+    if (empty_tile[1] + 1) != len(board[0]):  # Rightmost column check
         adjecent_tiles.append((empty_tile[0], empty_tile[1] + 1))
 
     return adjecent_tiles
@@ -173,17 +234,149 @@ def result(board, action):
     return new_board
 
 
-def path(initial_state, goal_state):
+# Ways of searching for the solution, see path
+METHODS = ["greedy", "astar", "idastar"]
+
+# Boards with at least this many cells are solved optimally with pattern
+# databases by default, see default_heuristic
+PDB_CELLS = 16
+
+
+def default_heuristic(rows, columns):
+    """
+    Return the heuristic the optimal methods use by default on boards of a
+    shape: pattern databases on boards of PDB_CELLS cells and more with a
+    partition in pattern_db.PARTITIONS, linear conflict otherwise.
+    """
+    if (rows * columns >= PDB_CELLS
+            and (rows, columns) in pattern_db.PARTITIONS):
+        return "pdb"
+    return "linear_conflict"
+
+
+def path(initial_state, goal_state, stats=None, method="greedy",
+         heuristic="linear_conflict", partition=None):
     """
     Return the list of board states representing a sequence of valid moves from
     initial to goal state.
+
+    The method is one of:
+    - "greedy": greedy best-first search, fast on small boards, but the
+      solution is usually not the shortest one
+    - "astar": A* search, finding a shortest solution
+    - "idastar": iterative deepening A*, finding a shortest solution in
+      memory proportional to its length
+    The optimal methods estimate distances with the given heuristic, either
+    "linear_conflict" (Manhattan distance with linear conflicts) or "pdb"
+    (additive pattern databases, see pattern_db). The databases are those of
+    partition, a list of tile groups, by default the one in
+    pattern_db.PARTITIONS for the board shape.
+
+    Pattern databases are the way to solve 4x4 boards optimally in seconds.
+    With linear conflict, deep 4x4 boards take IDA* millions of expansions
+    and minutes; default_heuristic picks the databases for such boards.
+
+    The work done is recorded in stats, a util.SearchStats. If stats is not
+    given, progress is reported on the terminal twice a second.
+    """
+    if stats is None:
+        stats = ut.SearchStats(report_progress)
+    stats.start("search")
+
+    # Half of all boards cannot be solved, which is cheap to tell, while the
+    # search would explore every reachable board first
+    if not is_solvable(initial_state, goal_state):
+        stats.stop()
+        return None
+
+    # Search over packed boards, see util.pack
+    puzzle = Puzzle(initial_state, goal_state, heuristic, partition)
+    if method == "greedy":
+        codes = greedy_path(puzzle, stats)
+    elif method == "astar":
+        codes = astar_path(puzzle, stats)
+    elif method == "idastar":
+        codes = idastar_path(puzzle, stats)
+    else:
+        raise ValueError("Unknown search method: " + str(method))
+
+    stats.start("reconstruct")
+    if codes is not None:
+        codes = [ut.unpack(code, puzzle.rows, puzzle.columns)
+                 for code in codes]
+    stats.stop()
+
+    return codes
+
+
+class Puzzle():
+    """
+    Initial and goal boards of a search, packed, with the tables needed to
+    move tiles and estimate distances on them. Moves are generated by the
+    Board of the puzzle's shape.
+    """
+
+    def __init__(self, initial_state, goal_state,
+                 heuristic="linear_conflict", partition=None):
+        self.rows = len(initial_state)
+        self.columns = len(initial_state[0])
+        self.cells = self.rows * self.columns
+        self.initial = ut.pack(initial_state)
+        self.goal = ut.pack(goal_state)
+        self.goal_cells = ut.goal_cells(self.goal, self.cells)
+        self.table = ut.ManhattanTable(self.goal_cells, self.rows,
+                                       self.columns)
+
+        # Yield (cell, child) pairs for every tile at cell that can move
+        # into the empty cell of a packed board, see Board.moves
+        self.moves = Board(self.rows, self.columns).moves
+
+        if heuristic == "pdb":
+            self.database = pattern_db.load(self.goal, self.rows,
+                                            self.columns, partition)
+            self.estimate = self.database_estimate
+        elif heuristic != "linear_conflict":
+            raise ValueError("Unknown heuristic: " + str(heuristic))
+
+    def estimate(self, code):
+        """Return an admissible estimate of the moves left to the goal."""
+        return ut.linear_conflict(ut.tiles(code, self.cells),
+                                  self.goal_cells, self.rows, self.columns)
+
+    def database_estimate(self, code):
+        """Return the estimate of the pattern databases."""
+        return self.database.estimate(ut.tiles(code, self.cells))
+
+    def blank(self, node):
+        """Return the empty cell of a node's board."""
+        if hasattr(node, "blank"):
+            return node.blank
+        if node.action is None:
+            return ut.blank_cell(node.state, self.cells)
+        return node.action
+
+
+def node_path(node):
+    """Return the states from the root of the search up to node."""
+    path = []
+    while node is not None:
+        path.append(node.state)
+        node = node.parent
+    path.reverse()
+    return path
+
+
+def greedy_path(puzzle, stats):
+    """
+    Return a solution found by greedy best-first search, see path.
     """
     frontier = ut.SlidingPuzzleFrontier()
     # Add the initial state to the frontier
-    frontier.add(ut.SlidingPuzzleNode(initial_state, None, None))
+    frontier.add(ut.SlidingPuzzleNode(puzzle.initial, None, None,
+                                      puzzle.table))
 
     # Initialize explored states with an empty set
-    explored_states = []
+    explored_states = set()
 
     # Searching for the solution of the sliding puzzle by removing nodes
     # containing board states from the frontier and adding their neighbors
@@ -191,8 +384,6 @@ def path(initial_state, goal_state):
     while(True):
         # If the frontier is empty, there is no path to solution and thus None
         # is returned
-        os.system('clear')
-        print("Searching for solution: " + str(len(explored_states)) + " states explored")
         if frontier.empty():
             return None
 
@@ -200,39 +391,121 @@ def path(initial_state, goal_state):
         # no move will immediately solve the puzzle, then remove a node from
         # the frontier. Otherwise solution has been found and we can exit the
         # search cycle.
-        goal_node = frontier.get_node_with_state(goal_state)
+        goal_node = frontier.get_node_with_state(puzzle.goal)
         if not goal_node:
             removed_node = frontier.remove()
-            # print_board(removed_node.state)
-            # time.sleep(0.6)
         else:
-            break
+            return node_path(goal_node)
 
         # Add the state of the board in the node we have just removed from the
         # frontier to the set of explored states.
-        explored_states.append(removed_node.state)
+        explored_states.add(removed_node.state)
 
         # Add nodes representing possible moves from the one just removed to
         # the frontier, in cases where the move would not result into already
         # explored state.
-        for action in actions(removed_node.state):
-            state = result(removed_node.state, action)
+        blank = puzzle.blank(removed_node)
+        for action, state in puzzle.moves(removed_node.state, blank):
             if state not in explored_states:
-                frontier.add(ut.SlidingPuzzleNode(state, removed_node, action))
+                frontier.add(ut.SlidingPuzzleNode(state, removed_node, action,
+                                                  puzzle.table))
 
-        goal_node = None
+        stats.expanded(len(frontier), len(explored_states))
 
-    # Reconstruct the sequence of moves from initial to goal state
-    path = []
-    index = goal_node
-    while index.state != initial_state:
-        path.append(index.state)
-        index = index.parent
 
-    path.append(index.state)
-    path.reverse()
+def astar_path(puzzle, stats):
+    """Return a shortest solution found by A* search, see path."""
+    frontier = ut.AStarFrontier()
+    frontier.add(ut.SlidingPuzzleNode(puzzle.initial, None, None,
+                                      puzzle.estimate))
 
-    return path
+    # Map explored states to the fewest moves they have been reached with
+    best_costs = {puzzle.initial: 0}
+
+    while True:
+        if frontier.empty():
+            return None
+
+        # A node is only known to be on a shortest solution once it has the
+        # lowest estimated cost of all nodes in the frontier
+        removed_node = frontier.remove()
+        if removed_node.state == puzzle.goal:
+            return node_path(removed_node)
+
+        # Skip nodes superseded by a cheaper way to their state
+        if removed_node.cost > best_costs[removed_node.state]:
+            continue
+
+        cost = removed_node.cost + 1
+        blank = puzzle.blank(removed_node)
+        for action, state in puzzle.moves(removed_node.state, blank):
+            if state not in best_costs or cost < best_costs[state]:
+                best_costs[state] = cost
+                frontier.add(ut.SlidingPuzzleNode(state, removed_node,
+                                                  action, puzzle.estimate))
+
+        stats.expanded(len(frontier), len(best_costs))
+
+
+def idastar_path(puzzle, stats):
+    """
+    Return a shortest solution found by iterative deepening A*, see path.
+
+    Depth-first searches are repeated with a growing bound on the estimated
+    total cost, so only the current path is kept in memory.
+    """
+    path = [puzzle.initial]
+    on_path = {puzzle.initial}
+
+    def search(blank, cost, bound):
+        """
+        Extend the path depth-first while the estimated total cost stays
+        within bound. Return True if the goal is reached, otherwise the
+        smallest estimated cost that exceeded the bound.
+        """
+        state = path[-1]
+        estimate = cost + puzzle.estimate(state)
+        if estimate > bound:
+            return estimate
+        if state == puzzle.goal:
+            return True
+
+        stats.expanded(len(path), len(on_path))
+        smallest = None
+        for cell, child in puzzle.moves(state, blank):
+            if child in on_path:
+                continue
+
+            path.append(child)
+            on_path.add(child)
+            found = search(cell, cost + 1, bound)
+            if found is True:
+                return True
+            path.pop()
+            on_path.remove(child)
+
+            if found is not None and (smallest is None or found < smallest):
+                smallest = found
+
+        return smallest
+
+    blank = ut.blank_cell(puzzle.initial, puzzle.cells)
+    bound = puzzle.estimate(puzzle.initial)
+    while True:
+        found = search(blank, 0, bound)
+        if found is True:
+            return path
+        if found is None:
+            return None
+        bound = found
+
+
+def report_progress(stats):
+    """Print the progress of a search on a single terminal line."""
+    print("\rSearching for solution: " + str(stats.explored) +
+          " states explored", end="", flush=True)
+    if not stats.running():
+        print()
 
 
 def play_solution(path):
@@ -0,0 +1,104 @@
+import itertools
+import random
+from collections import deque
+
+import pattern_db
+import sliding_puzzle as sp
+import util as ut
+
+
+def manhattan(board):
+    """
+    Returns the Manhattan distance of a square board from the solved one,
+    the empty tile included, computed from scratch.
+    """
+    size = len(board)
+    distance = 0
+    for i, row in enumerate(board):
+        for j, tile in enumerate(row):
+            goal = size * size - 1 if tile is None else tile - 1
+            distance += abs(i - goal // size) + abs(j - goal % size)
+    return distance
+
+
+def depths(rows, columns):
+    """
+    Returns a dict mapping every packed board of the given shape that can
+    reach the goal to its fewest moves, found by breadth-first search
+    backwards from the goal.
+    """
+    cells = rows * columns
+    goal = ut.pack(sp.goal_state(rows, columns))
+    found = {goal: 0}
+    queue = deque([(goal, cells - 1)])
+    while queue:
+        code, blank = queue.popleft()
+        for cell in ut.adjacent_cells(blank, rows, columns):
+            child = ut.move_tile(code, blank, cell, cells)
+            if child not in found:
+                found[child] = found[code] + 1
+                queue.append((child, cell))
+    return found
+
+
+# Check the incrementally updated distances of nodes against the Manhattan
+# distance computed from scratch, along random walks of board lists, and on
+# packed boards with the table of their shape
+rng = random.Random(0)
+nodes = 0
+for size in range(2, 6):
+    table = ut.solved_table(size, size)
+    for _ in range(20):
+        board = sp.random_walk(sp.goal_state(size), 50, rng)
+        node = ut.SlidingPuzzleNode(board, None, None)
+        for _ in range(50):
+            assert node.distance == manhattan(node.state)
+            packed = ut.SlidingPuzzleNode(ut.pack(node.state), None, None,
+                                          table)
+            assert packed.distance == node.distance
+            action = rng.choice(sp.actions(node.state))
+            node = ut.SlidingPuzzleNode(sp.result(node.state, action), node,
+                                        action)
+            nodes += 1
+
+print("Node distances checked on " + str(nodes) + " moves")
+
+# Check the parity test of solvability against breadth-first search on
+# every board of the small shapes
+for rows, columns in [(2, 2), (2, 3), (3, 2), (3, 3)]:
+    goal = sp.goal_state(rows, columns)
+    reachable = depths(rows, columns)
+    count = 0
+    for permutation in itertools.permutations(range(rows * columns)):
+        board = [[tile or None for tile in
+                  permutation[i * columns:(i + 1) * columns]]
+                 for i in range(rows)]
+        assert sp.is_solvable(board, goal) == (ut.pack(board) in reachable)
+        count += 1
+    print("Solvability checked on " + str(count) + " " + str(rows) + "x"
+          + str(columns) + " boards")
+
+# The optimal methods must find solutions as short as breadth-first search
+# does, with either heuristic
+by_depth = depths(3, 3)
+goal = sp.goal_state(3)
+samples = random.Random(0).sample(sorted(by_depth), 100)
+for code in samples:
+    board = ut.unpack(code, 3, 3)
+    for method in ["astar", "idastar"]:
+        for heuristic in ["linear_conflict", "pdb"]:
+            solution = sp.path(board, goal, ut.SearchStats(), method=method,
+                               heuristic=heuristic)
+            assert len(solution) - 1 == by_depth[code]
+
+print("Optimal solutions checked on " + str(len(samples)) + " 3x3 boards")
+
+# Pattern databases must never overestimate the fewest moves
+for rows, columns in [(2, 2), (3, 3)]:
+    found = depths(rows, columns)
+    database = pattern_db.load(ut.pack(sp.goal_state(rows, columns)), rows,
+                               columns)
+    for code, depth in found.items():
+        assert database.estimate(ut.tiles(code, rows * columns)) <= depth
+    print("Pattern databases checked on " + str(len(found)) + " "
+          + str(rows) + "x" + str(columns) + " boards")
@@ -1,3 +1,8 @@
+import heapq
+import itertools
+import time
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -6,59 +11,274 @@ class Node():
 
 
 class SlidingPuzzleNode(Node):
-    def __init__(self, state, parent, action):
+    """
+    Node of a sliding puzzle search, which knows the number of moves made
+    to reach its state and an estimate of the moves left.
+
+    heuristic is either a function of the state or a ManhattanTable, whose
+    distances are updated move by move. Without one, boards of nested lists
+    get the Manhattan distance from the solved board of their shape. Packed
+    boards (see pack) do not tell their shape, so they need a heuristic.
+    """
+
+    def __init__(self, state, parent, action, heuristic=None):
         self.state = state
         self.parent = parent
         self.action = action
         self.distance = 0
 
-        # Evaluate the state
-        # flat_board = []
-        # for row in state:
-        #     flat_board = flat_board + row
-
-        # for tile in flat_board:
-        #     if not tile:  # Empty tile case
-        #         expected_tile_value = len(state) * len(state)
-        #         self.value += abs(flat_board.index(tile) +
-        #                           1 - expected_tile_value)
-        #     else:
-        #         self.value += abs(flat_board.index(tile) + 1 - tile)
-
-        # Estimate the distance from the goal
-        self.distance = self.estimate_distance()
+        # Number of moves made from the initial state
+        self.cost = 0 if parent is None else parent.cost + 1
+
+        # Estimate the distance from the goal. By default it is the
+        # Manhattan distance from the solved board, kept up to date move by
+        # move. Other heuristic functions are evaluated on the state.
+        if heuristic is None:
+            if isinstance(state, int):
+                raise ValueError("Packed boards need a heuristic, such as "
+                                 "the ManhattanTable of their shape")
+            heuristic = solved_table(len(state), len(state[0]))
+
+        if not isinstance(heuristic, ManhattanTable):
+            self.distance = heuristic(state)
+        elif parent is None:
+            tiles = heuristic.tiles(state)
+            self.blank = tiles.index(0)
+            self.distance = heuristic.distance(tiles)
+        else:
+            # The tile at action moved into the parent's empty cell
+            self.blank = heuristic.cell(action)
+            tile = heuristic.tile(state, parent.blank)
+            self.distance = heuristic.update(parent.distance, tile,
+                                             parent.blank, self.blank)
 
     def estimate_distance(self, method='manhattan'):
         """Estimate the distance of the node from a node with a goal state."""
         if method == 'manhattan':
-            # So called manhattan method defines a distance of given state to
-            distance = 0
-
-            # Generate solved state
-            solved_state = []
-            board_size = len(self.state)
-            for i in range(1, board_size + 1):
-                row = []
-                for j in range(1, board_size + 1):
-                    if i == board_size and j == board_size:
-                        row.append(None)
-                    else:
-                        row.append(((i - 1) * board_size) + j)
-                solved_state.append(row)
-
-            # Estimate distance of node's state from solved one
-            for row in self.state:
-                for tile in row:
-                    actual_pos = (self.state.index(row), row.index(tile))
-                    for solved_row in solved_state:
-                        if tile in solved_row:
-                            solved_pos = (solved_state.index(solved_row),
-                                          solved_row.index(tile))
-                            break
-                    distance += (abs(actual_pos[0] - solved_pos[0]) +
-                                 abs(actual_pos[1] - solved_pos[1]))
-
-        return distance
+            # So called manhattan method sums up the distances of all tiles,
+            # the empty one included, from their places on the solved board
+            table = solved_table(len(self.state), len(self.state[0]))
+            return table.distance(table.tiles(self.state))
+
+        return 0
+
+
+class ManhattanTable():
+    """
+    Manhattan distances of every tile from its goal cell, precomputed for a
+    board shape, so that a move updates the distance of a board in constant
+    time.
+
+    Boards may be lists of rows or packed integers (see pack), and cells are
+    numbered row by row. Actions are cells of packed boards or (row, column)
+    pairs of board lists.
+    """
+
+    def __init__(self, goal_cells, rows, columns, blank=True):
+        self.rows = rows
+        self.columns = columns
+        self.cells = rows * columns
+        self.bits = tile_bits(self.cells)
+        self.mask = (1 << self.bits) - 1
+
+        # table[tile][cell] is the distance of tile at cell from its goal
+        self.table = []
+        for goal in goal_cells:
+            self.table.append([abs(cell // columns - goal // columns)
+                               + abs(cell % columns - goal % columns)
+                               for cell in range(self.cells)])
+
+        # The empty tile only counts if blank is True
+        if not blank:
+            self.table[0] = [0] * self.cells
+
+    def cell(self, action):
+        """Return the cell index of an action."""
+        if isinstance(action, tuple):
+            return action[0] * self.columns + action[1]
+        return action
+
+    def tile(self, state, cell):
+        """Return the tile at a cell of a board, 0 being the empty one."""
+        if isinstance(state, list):
+            return state[cell // self.columns][cell % self.columns] or 0
+        return (state >> (self.bits * cell)) & self.mask
+
+    def tiles(self, state):
+        """Return the tiles of a board as a flat list, 0 being empty."""
+        if isinstance(state, list):
+            return [tile or 0 for row in state for tile in row]
+        return tiles(state, self.cells)
+
+    def distance(self, tiles):
+        """Return the distance of a flat list of tiles."""
+        table = self.table
+        return sum(table[tile][cell] for cell, tile in enumerate(tiles))
+
+    def update(self, distance, tile, blank, cell):
+        """
+        Return the distance of a board after moving tile from cell into the
+        empty cell blank, given its distance before the move.
+        """
+        table = self.table
+        return (distance + table[tile][blank] - table[tile][cell]
+                + table[0][cell] - table[0][blank])
+
+
+# ManhattanTables of solved boards, by shape
+solved_tables = {}
+
+
+def solved_table(rows, columns):
+    """
+    Return the ManhattanTable, empty tile included, of the solved board of
+    a shape, with the tiles in ascending order and the empty cell last.
+    """
+    if (rows, columns) not in solved_tables:
+        cells = rows * columns
+        goal_cells = [cells - 1] + list(range(cells - 1))
+        solved_tables[(rows, columns)] = ManhattanTable(goal_cells, rows,
+                                                        columns)
+    return solved_tables[(rows, columns)]
+
+
+def tile_bits(cells):
+    """Return the number of bits per tile of a packed board of cells cells."""
+    return max(4, (cells - 1).bit_length())
+
+
+def pack(board):
+    """
+    Pack a board into an integer. Cells are stored row by row from the
+    lowest bits, tile_bits bits each, with the empty tile as 0, so boards
+    up to 4x4 fit into 64 bits.
+    """
+    cells = [tile or 0 for row in board for tile in row]
+    bits = tile_bits(len(cells))
+    code = 0
+    for tile in reversed(cells):
+        code = (code << bits) | tile
+    return code
+
+
+def unpack(code, rows, columns):
+    """Return the board of the given shape packed into code."""
+    bits = tile_bits(rows * columns)
+    mask = (1 << bits) - 1
+    board = []
+    for i in range(rows):
+        row = []
+        for j in range(columns):
+            row.append((code & mask) or None)
+            code >>= bits
+        board.append(row)
+    return board
+
+
+def tiles(code, cells):
+    """Return the tiles of a packed board as a flat list, 0 being empty."""
+    bits = tile_bits(cells)
+    mask = (1 << bits) - 1
+    return [(code >> (bits * cell)) & mask for cell in range(cells)]
+
+
+def blank_cell(code, cells):
+    """Return the index of the empty cell of a packed board."""
+    return tiles(code, cells).index(0)
+
+
+def move_tile(code, blank, cell, cells):
+    """
+    Return the packed board after moving the tile at cell into the empty
+    cell blank. Since the empty cell holds 0, swapping the two comes down
+    to moving the tile's bits.
+    """
+    bits = tile_bits(cells)
+    tile = (code >> (bits * cell)) & ((1 << bits) - 1)
+    return code ^ (tile << (bits * cell)) ^ (tile << (bits * blank))
+
+
+def adjacent_cells(cell, rows, columns):
+    """Return the indices of the cells next to a cell of a board."""
+    i, j = divmod(cell, columns)
+    adjacent = []
+    if i != 0:
+        adjacent.append(cell - columns)
+    if i + 1 != rows:
+        adjacent.append(cell + columns)
+    if j != 0:
+        adjacent.append(cell - 1)
+    if j + 1 != columns:
+        adjacent.append(cell + 1)
+    return adjacent
+
+
+def goal_cells(goal, cells):
+    """
+    Return a list mapping every tile, 0 being the empty one, to its cell in
+    the packed goal board.
+    """
+    table = [0] * cells
+    for cell, tile in enumerate(tiles(goal, cells)):
+        table[tile] = cell
+    return table
+
+
+def manhattan_distance(tiles, goal_cells, columns, blank=False):
+    """
+    Return the sum of the Manhattan distances of all tiles (a flat list, as
+    returned by tiles) from their cells in the goal board.
+
+    The empty tile only counts if blank is True. Without it the estimate is
+    admissible: every move brings a single tile one step closer at best.
+    """
+    distance = 0
+    for cell, tile in enumerate(tiles):
+        if tile or blank:
+            goal = goal_cells[tile]
+            distance += (abs(cell // columns - goal // columns)
+                         + abs(cell % columns - goal % columns))
+    return distance
+
+
+def linear_conflict(tiles, goal_cells, rows, columns):
+    """
+    Return the Manhattan distance increased by the linear conflicts of the
+    tiles, an admissible estimate at least as good as Manhattan distance.
+
+    Tiles that are in their goal row, but in the wrong order, have to
+    leave the row to pass each other. In every row, all tiles outside the
+    longest correctly ordered subsequence need two extra moves each, and the
+    same holds for columns.
+    """
+    distance = manhattan_distance(tiles, goal_cells, columns)
+
+    for i in range(rows):
+        goal_columns = []
+        for cell in range(i * columns, (i + 1) * columns):
+            goal = goal_cells[tiles[cell]]
+            if tiles[cell] and goal // columns == i:
+                goal_columns.append(goal % columns)
+        distance += 2 * (len(goal_columns) - ordered_length(goal_columns))
+
+    for j in range(columns):
+        goal_rows = []
+        for cell in range(j, rows * columns, columns):
+            goal = goal_cells[tiles[cell]]
+            if tiles[cell] and goal % columns == j:
+                goal_rows.append(goal // columns)
+        distance += 2 * (len(goal_rows) - ordered_length(goal_rows))
+
+    return distance
+
+
+def ordered_length(values):
+    """Return the length of the longest increasing subsequence of values."""
+    lengths = []
+    for i, value in enumerate(values):
+        lengths.append(1 + max([lengths[k] for k in range(i)
+                                if values[k] < value], default=0))
+    return max(lengths, default=0)
 
 
 class StackFrontier():
@@ -106,26 +326,176 @@ class QueueFrontier(StackFrontier):
             return node
 
 
-class SlidingPuzzleFrontier(StackFrontier):
+def state_key(state):
+    """Return a hashable key for a board state."""
+    if isinstance(state, list):
+        return tuple(tuple(row) for row in state)
+    return state
 
-    def optimal_move(self):
-        optimal = None
-        for node in self.frontier:
-            if not optimal:
-                optimal = node
-            elif node.distance < optimal.distance:
-                optimal = node
 
-        return optimal
+class HeapFrontier():
+    """
+    Priority frontier on a binary heap, removing the node with the lowest
+    priority(node) first. Ties are removed in the order they were added.
+
+    Nodes are indexed by the key of their state, so goal and duplicate
+    checks take constant time. Adding a node for a state that is already in
+    the frontier replaces the old node if the new one has a lower priority
+    (decrease-key). The old heap entry is not searched for, but skipped
+    once it reaches the top of the heap.
+    """
+
+    def __init__(self, priority):
+        self.heap = []
+        self.nodes = {}
+        self.counter = itertools.count()
+        self.priority = priority
+
+    @property
+    def frontier(self):
+        return list(self.nodes.values())
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, node):
+        key = state_key(node.state)
+        priority = self.priority(node)
+        old = self.nodes.get(key)
+        if old is not None and self.priority(old) <= priority:
+            return
+        self.nodes[key] = node
+        heapq.heappush(self.heap, (priority, next(self.counter), node))
+
+    def contains_state(self, state):
+        return state_key(state) in self.nodes
+
+    def get_node_with_state(self, state):
+        return self.nodes.get(state_key(state))
+
+    def empty(self):
+        return len(self.nodes) == 0
+
+    def optimal_move(self):
+        """Return the node that would be removed next, or None."""
+        self.drop_stale()
+        return self.heap[0][2] if self.heap else None
 
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.optimal_move()
-            self.frontier.remove(node)
+            self.drop_stale()
+            node = heapq.heappop(self.heap)[2]
+            del self.nodes[state_key(node.state)]
             return node
 
+    def drop_stale(self):
+        """Pop entries of replaced nodes off the top of the heap."""
+        heap = self.heap
+        while heap and self.nodes.get(state_key(heap[0][2].state)) \
+                is not heap[0][2]:
+            heapq.heappop(heap)
+
+    def states_in_frontier(self):
+        return [node.state for node in self.nodes.values()]
+
+
+class SlidingPuzzleFrontier(HeapFrontier):
+    """Frontier removing the node with the lowest distance first."""
+
+    def __init__(self):
+        super().__init__(lambda node: node.distance)
+
+
+class AStarFrontier(HeapFrontier):
+    """
+    Frontier removing the node with the lowest estimated total cost of a
+    solution through it, that is, moves made so far plus the distance.
+    Among equal totals, nodes closer to the goal go first.
+    """
+
+    def __init__(self):
+        super().__init__(lambda node: (node.cost + node.distance,
+                                       node.distance))
+
+
+class SearchStats():
+    """
+    Counts the work done by a search and times its phases.
+
+    If a callback is given, it is called with the stats at most once every
+    interval seconds while the search runs, and once more when it stops.
+    """
+
+    def __init__(self, callback=None, interval=0.5):
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.explored = 0
+        self.phases = {}
+        self.callback = callback
+        self.interval = interval
+        self.phase = None
+        self.phase_start = None
+        self.last_report = None
+
+    def start(self, phase):
+        """Ends the running phase, if any, and starts timing a new one."""
+        now = time.perf_counter()
+        self.end_phase(now)
+        self.phase = phase
+        self.phase_start = now
+        if self.last_report is None:
+            self.last_report = now
+
+    def stop(self):
+        """Ends the running phase and reports the final stats."""
+        self.end_phase(time.perf_counter())
+        if self.callback is not None:
+            self.callback(self)
+
+    def end_phase(self, now):
+        if self.phase is not None:
+            self.phases[self.phase] = (self.phases.get(self.phase, 0.0)
+                                       + now - self.phase_start)
+            self.phase = None
+
+    def expanded(self, frontier_size, explored_size):
+        """
+        Records the expansion of a node, given the sizes of the frontier and
+        of the explored set afterwards.
+        """
+        self.nodes_expanded += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        self.explored = explored_size
+
+        if self.callback is not None:
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.callback(self)
+
+    def running(self):
+        return self.phase is not None
+
+    def elapsed(self):
+        """Returns the time spent in all phases so far."""
+        elapsed = sum(self.phases.values())
+        if self.phase is not None:
+            elapsed += time.perf_counter() - self.phase_start
+        return elapsed
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "peak_frontier": self.peak_frontier,
+            "explored": self.explored,
+            "elapsed": round(self.elapsed(), 6),
+            "phases": {phase: round(seconds, 6)
+                       for phase, seconds in self.phases.items()}
+        }
+
 
 class _Getch:
     """Gets a single character from standard input.  Does not echo to the
@@ -0,0 +1,217 @@
+"""
+Tic Tac Toe on bitboards
+
+A board is a pair of 9-bit masks, the cells taken by X and the cells taken
+by O, with cell i * 3 + j of the board at bit i * 3 + j. Everything that
+only depends on a mask, such as whether it holds a full line or which cells
+it leaves free, is precomputed for all 512 masks, so the search only does
+table lookups and bit operations.
+
+The board has eight symmetries, its rotations and reflections, which do not
+change the value of a position. Searches and tables only keep canonical
+boards, the smallest of the eight images of a board by key, and map moves
+back to the board they were asked about.
+"""
+
+X = "X"
+O = "O"
+
+# Mask of all cells
+FULL = 0b111111111
+
+# Masks of the rows, columns and diagonals
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+]
+
+# WINS[mask] is True if the cells of mask include a whole line
+WINS = [any(mask & line == line for line in LINES)
+        for mask in range(FULL + 1)]
+
+# COUNTS[mask] is the number of cells in mask
+COUNTS = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+# MOVES[mask] are the cells in mask, the free cells of a board being the
+# moves available on it
+MOVES = [tuple(cell for cell in range(9) if mask & (1 << cell))
+         for mask in range(FULL + 1)]
+
+
+def symmetries():
+    """
+    Returns the eight symmetries of the board as lists mapping every cell
+    to its image, the identity first.
+    """
+    def rotate(cell):
+        i, j = divmod(cell, 3)
+        return j * 3 + (2 - i)
+
+    def reflect(cell):
+        i, j = divmod(cell, 3)
+        return i * 3 + (2 - j)
+
+    permutations = []
+    permutation = list(range(9))
+    for _ in range(4):
+        permutations.append(permutation)
+        permutations.append([reflect(cell) for cell in permutation])
+        permutation = [rotate(cell) for cell in permutation]
+    return permutations
+
+
+# SYMMETRIES[s][cell] is the image of cell under symmetry s and
+# INVERSES[s][image] the cell it is the image of
+SYMMETRIES = symmetries()
+INVERSES = [[permutation.index(cell) for cell in range(9)]
+            for permutation in SYMMETRIES]
+
+# IMAGES[s][mask] is the image of mask under symmetry s
+IMAGES = [[sum(1 << permutation[cell] for cell in MOVES[mask])
+           for mask in range(FULL + 1)]
+          for permutation in SYMMETRIES]
+
+# Values and optimal moves of searched canonical boards, keyed by key, the
+# moves being cells of the canonical board
+transpositions = {}
+
+
+def from_board(board):
+    """Returns the (xs, os) masks of a board of nested lists."""
+    xs = os = 0
+    for cell in range(9):
+        mark = board[cell // 3][cell % 3]
+        if mark == X:
+            xs |= 1 << cell
+        elif mark == O:
+            os |= 1 << cell
+    return xs, os
+
+
+def to_board(xs, os):
+    """Returns the board of nested lists of the masks."""
+    board = [[None, None, None] for _ in range(3)]
+    for cell in range(9):
+        if xs & (1 << cell):
+            board[cell // 3][cell % 3] = X
+        elif os & (1 << cell):
+            board[cell // 3][cell % 3] = O
+    return board
+
+
+def key(xs, os):
+    """Returns the masks packed into a single integer."""
+    return (xs << 9) | os
+
+
+def canonical(xs, os):
+    """
+    Returns the (xs, os, symmetry) triple of the canonical board of a board,
+    symmetry being the one that maps the board to it.
+    """
+    best = None
+    for symmetry, images in enumerate(IMAGES):
+        image = (images[xs] << 9) | images[os]
+        if best is None or image < best:
+            best = image
+            best_symmetry = symmetry
+    return best >> 9, best & FULL, best_symmetry
+
+
+def player(xs, os):
+    """Returns the player who has the next turn."""
+    return X if COUNTS[xs] == COUNTS[os] else O
+
+
+def actions(xs, os):
+    """Returns the free cells."""
+    return MOVES[FULL & ~(xs | os)]
+
+
+def result(xs, os, cell):
+    """Returns the masks after the player to move takes cell."""
+    if COUNTS[xs] == COUNTS[os]:
+        return xs | (1 << cell), os
+    return xs, os | (1 << cell)
+
+
+def winner(xs, os):
+    """Returns the winner of the game, if there is one."""
+    if WINS[xs]:
+        return X
+    if WINS[os]:
+        return O
+    return None
+
+
+def terminal(xs, os):
+    """Returns True if game is over, False otherwise."""
+    return WINS[xs] or WINS[os] or (xs | os) == FULL
+
+
+def utility(xs, os):
+    """Returns 1 if X has won the game, -1 if O has won, 0 otherwise."""
+    if WINS[xs]:
+        return 1
+    if WINS[os]:
+        return -1
+    return 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action (i, j) for the current player on a board of
+    nested lists, or None if the game is over.
+    """
+    cell = search(*from_board(board))[1]
+    return None if cell is None else divmod(cell, 3)
+
+
+def search(xs, os):
+    """
+    Returns the (value, optimal cell) pair of the board, the cell being None
+    if the game is over. The board is searched in its canonical form.
+    """
+    xs, os, symmetry = canonical(xs, os)
+    value, cell = search_canonical(xs, os)
+    return value, None if cell is None else INVERSES[symmetry][cell]
+
+
+def search_canonical(xs, os):
+    """
+    Returns the (value, optimal cell) pair of a canonical board. Like
+    tictactoe.abp_search, search stops on a winning move and keeps every
+    board it searched in the transposition table.
+    """
+    position = (xs << 9) | os  # see key
+    if position in transpositions:
+        return transpositions[position]
+
+    if WINS[xs]:
+        entry = (1, None)
+    elif WINS[os]:
+        entry = (-1, None)
+    elif (xs | os) == FULL:
+        entry = (0, None)
+    elif COUNTS[xs] == COUNTS[os]:
+        # X moves and maximizes
+        entry = (-2, None)
+        for cell in MOVES[FULL & ~(xs | os)]:
+            value = search_canonical(*canonical(xs | (1 << cell), os)[:2])[0]
+            if value > entry[0]:
+                entry = (value, cell)
+                if value == 1:
+                    break
+    else:
+        # O moves and minimizes
+        entry = (2, None)
+        for cell in MOVES[FULL & ~(xs | os)]:
+            value = search_canonical(*canonical(xs, os | (1 << cell))[:2])[0]
+            if value < entry[0]:
+                entry = (value, cell)
+                if value == -1:
+                    break
+
+    transpositions[position] = entry
+    return entry
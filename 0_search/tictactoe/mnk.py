@@ -0,0 +1,330 @@
+"""
+m,n,k-games
+
+Tic Tac Toe generalized to boards of m rows and n columns, won by the first
+player to get k marks in a row, column or diagonal. Tic Tac Toe itself is
+the 3,3,3-game.
+
+Boards are pairs of bitboards as in bitboard.py, with cell i * n + j at bit
+i * n + j. Moves are searched by alpha-beta search with iterative
+deepening, so a search can be given a time budget and still return the
+best move of the deepest search it completed. Boards the search cannot see
+to the end of are scored by a pluggable evaluation function.
+"""
+
+import argparse
+import time
+
+X = "X"
+O = "O"
+
+# Score of a won game. Wins found sooner score higher, and evaluations must
+# stay well below it.
+WIN = 10 ** 9
+
+# Number of boards whose best moves are remembered, after which the memory
+# is cleared at the start of the next search
+PV_LIMIT = 10 ** 6
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its time budget runs out."""
+
+
+class Game():
+    """
+    Rules of an m,n,k-game together with its search.
+
+    evaluate(game, own, other) scores a board from the point of view of the
+    player to move, own and other being the bitboards of that player and of
+    the opponent; see line_evaluation. book(xs, os), if given, returns a
+    move to play without searching, or None.
+
+    The best move found for every searched board is remembered, and is the
+    first move tried when the board is searched again, deeper or in a later
+    search. This keeps the principal variation of the previous iteration
+    first in line, which is where alpha-beta search prunes the most.
+    """
+
+    def __init__(self, rows=3, columns=3, k=3, evaluate=None, book=None):
+        if not 0 < k <= max(rows, columns):
+            raise ValueError("k must be between 1 and the board size")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.cells = rows * columns
+        self.full = (1 << self.cells) - 1
+        self.evaluate = evaluate or line_evaluation
+        self.book = book
+
+        # Masks of all k cells long rows, columns and diagonals, and the
+        # masks of those running through each cell
+        self.lines = []
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        self.lines.append(sum(
+                            1 << ((i + di * step) * columns + j + dj * step)
+                            for step in range(k)))
+        self.cell_lines = [[line for line in self.lines if line >> cell & 1]
+                           for cell in range(self.cells)]
+
+        # Cells from the center outwards, the order moves are tried in
+        # unless there is a reason to try others first
+        center_i = (rows - 1) / 2
+        center_j = (columns - 1) / 2
+        self.order = sorted(
+            range(self.cells),
+            key=lambda cell: (abs(cell // columns - center_i)
+                              + abs(cell % columns - center_j), cell))
+
+        # Best moves by position, see position
+        self.pv = {}
+        self.nodes = 0
+        self.deadline = None
+
+    def position(self, own, other):
+        """
+        Returns the key of a board in the move cache. Since the player to
+        move always has as many marks as the opponent or one fewer, own and
+        other are never swapped between two boards with the same key.
+        """
+        return (own << self.cells) | other
+
+    def from_board(self, board):
+        """Returns the (xs, os) bitboards of a board of nested lists."""
+        xs = os = 0
+        for i, row in enumerate(board):
+            for j, mark in enumerate(row):
+                if mark == X:
+                    xs |= 1 << (i * self.columns + j)
+                elif mark == O:
+                    os |= 1 << (i * self.columns + j)
+        return xs, os
+
+    def player(self, xs, os):
+        """Returns the player who has the next turn."""
+        return X if bin(xs).count("1") == bin(os).count("1") else O
+
+    def wins(self, marks, cell):
+        """Returns True if marks hold a whole line through cell."""
+        for line in self.cell_lines[cell]:
+            if marks & line == line:
+                return True
+        return False
+
+    def winner(self, xs, os):
+        """Returns the winner of the game, if there is one."""
+        for line in self.lines:
+            if xs & line == line:
+                return X
+            if os & line == line:
+                return O
+        return None
+
+    def terminal(self, xs, os):
+        """Returns True if game is over, False otherwise."""
+        return (xs | os) == self.full or self.winner(xs, os) is not None
+
+    def best_move(self, board, time_limit=None, max_depth=None):
+        """
+        Returns the best action (i, j) for the current player on a board of
+        nested lists, or None if the game is over. See search.
+        """
+        xs, os = self.from_board(board)
+        if self.terminal(xs, os):
+            return None
+
+        cell = self.book(xs, os) if self.book else None
+        if cell is None:
+            cell = self.search(xs, os, time_limit, max_depth)[0]
+        return divmod(cell, self.columns)
+
+    def search(self, xs, os, time_limit=None, max_depth=None):
+        """
+        Returns a (cell, score, depth) triple with the best move for the
+        player to move on a board that is not over, its score for that
+        player, and the depth of the deepest search completed.
+
+        Searches one, two, ... moves deep, until the game has been searched
+        to its end, max_depth is reached or time_limit seconds have passed.
+        """
+        if self.player(xs, os) == X:
+            own, other = xs, os
+        else:
+            own, other = os, xs
+        remaining = bin(self.full & ~(xs | os)).count("1")
+        if max_depth is None or max_depth > remaining:
+            max_depth = remaining
+
+        if len(self.pv) > PV_LIMIT:
+            self.pv.clear()
+        self.deadline = (time.perf_counter() + time_limit
+                         if time_limit is not None else None)
+        best = None
+        try:
+            for depth in range(1, max_depth + 1):
+                score = self.negamax(own, other, depth, -WIN - 1, WIN + 1, 0)
+                best = (self.pv[self.position(own, other)], score, depth)
+                # Stop once the outcome is certain
+                if abs(score) >= WIN - self.cells:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+
+        if best is None:
+            # Not even one move deep could be searched in time
+            best = (self.ordered_moves(own, other)[0], 0, 0)
+        return best
+
+    def negamax(self, own, other, depth, alpha, beta, ply):
+        """
+        Returns the score of a board for the player to move, searched depth
+        moves deep, if it lies between alpha and beta. Otherwise returns a
+        score at most alpha, or at least beta, and the true score is not
+        better, or not worse, respectively.
+        """
+        self.nodes += 1
+        if (self.deadline is not None and self.nodes % 1024 == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+        key = self.position(own, other)
+        moves = self.ordered_moves(own, other)
+
+        # A winning move needs no search
+        if self.wins(own | (1 << moves[0]), moves[0]):
+            self.pv[key] = moves[0]
+            return WIN - ply - 1
+
+        best = None
+        for cell in moves:
+            marks = own | (1 << cell)
+            if (marks | other) == self.full:
+                score = 0
+            elif depth == 1:
+                score = -self.evaluate(self, other, marks)
+            else:
+                score = -self.negamax(other, marks, depth - 1,
+                                      -beta, -alpha, ply + 1)
+
+            if best is None or score > best:
+                best = score
+                self.pv[key] = cell
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+
+        return best
+
+    def ordered_moves(self, own, other):
+        """
+        Returns the free cells in the order they should be searched: moves
+        that win, then moves that block a win of the opponent, then the
+        move found best when the board was last searched, then the others
+        from the center outwards.
+        """
+        taken = own | other
+        best = self.pv.get(self.position(own, other))
+        first = []
+        blocks = []
+        rest = []
+        for cell in self.order:
+            if taken >> cell & 1:
+                continue
+            bit = 1 << cell
+            if self.wins(own | bit, cell):
+                return [cell] + [c for c in self.order
+                                 if not taken >> c & 1 and c != cell]
+            if self.wins(other | bit, cell):
+                blocks.append(cell)
+            elif cell == best:
+                first.append(cell)
+            else:
+                rest.append(cell)
+        return blocks + first + rest
+
+
+def line_evaluation(game, own, other):
+    """
+    Scores a board for the player to move by its open lines, i.e. lines
+    only one player has marks in. An open line with c marks is worth
+    4 ** c, counted for the player owning it and against the opponent.
+    """
+    score = 0
+    for line in game.lines:
+        mine = own & line
+        theirs = other & line
+        if mine and not theirs:
+            score += 4 ** bin(mine).count("1")
+        elif theirs and not mine:
+            score -= 4 ** bin(theirs).count("1")
+    return score
+
+
+def print_board(game, xs, os):
+    for i in range(game.rows):
+        for j in range(game.columns):
+            bit = 1 << (i * game.columns + j)
+            if xs & bit:
+                print(" X ", end="")
+            elif os & bit:
+                print(" O ", end="")
+            else:
+                print("[ ]", end="")
+        print("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play an m,n,k-game against the computer.")
+    parser.add_argument("rows", type=int, nargs="?", default=3)
+    parser.add_argument("columns", type=int, nargs="?", default=3)
+    parser.add_argument("k", type=int, nargs="?", default=3)
+    parser.add_argument("--time", type=float, default=2.0,
+                        help="seconds the computer may think per move")
+    parser.add_argument("--play", choices=[X, O], default=X,
+                        help="the player you play (X moves first)")
+    args = parser.parse_args()
+
+    game = Game(args.rows, args.columns, args.k)
+    xs = os = 0
+    while not game.terminal(xs, os):
+        print_board(game, xs, os)
+        turn = game.player(xs, os)
+        if turn == args.play:
+            try:
+                i, j = (int(n) for n in input("Your move (row column): ")
+                        .split())
+                cell = i * game.columns + j
+            except ValueError:
+                continue
+            if not (0 <= i < game.rows and 0 <= j < game.columns) or (
+                    (xs | os) >> cell & 1):
+                print("This was not a valid move!")
+                continue
+        else:
+            game.nodes = 0
+            start = time.perf_counter()
+            cell, score, depth = game.search(xs, os, time_limit=args.time)
+            print(f"Computer plays {divmod(cell, game.columns)} "
+                  f"(depth {depth}, {game.nodes} nodes, "
+                  f"{time.perf_counter() - start:.2f}s)")
+
+        if turn == X:
+            xs |= 1 << cell
+        else:
+            os |= 1 << cell
+
+    print_board(game, xs, os)
+    print("Game over: " + (game.winner(xs, os) or "tie"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
+import logging
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Frames drawn per second
+FPS = 30
+
+# Shortest time the computer seems to think, so its moves can be followed
+AI_DELAY = 0.5
+
+# Seconds between logged frame time summaries
+LOG_INTERVAL = 5
+
+logging.basicConfig(level=logging.INFO,
+                    format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("runner")
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -19,12 +34,36 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The computer's moves are searched by a worker thread, so the window keeps
+# being drawn and answering events meanwhile
+executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_start = None
+
+clock = pygame.time.Clock()
+frame_times = []
+
+
+def timed(function, *args):
+    """Return the result of a call and the seconds it took."""
+    start = time.perf_counter()
+    return function(*args), time.perf_counter() - start
+
 
 while True:
 
+    # Keep a steady frame rate and log how long frames take
+    frame_times.append(clock.tick(FPS))
+    if sum(frame_times) >= LOG_INTERVAL * 1000:
+        logger.info("%d frames, %.1f ms mean, %d ms max frame time",
+                    len(frame_times), sum(frame_times) / len(frame_times),
+                    max(frame_times))
+        frame_times = []
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            executor.shutdown(wait=False)
             sys.exit()
 
     screen.fill(black)
@@ -102,21 +141,25 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.perf_counter() * 3) % 4)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searched by the worker and played once ready
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                ai_start = time.perf_counter()
+                ai_future = executor.submit(timed, ttt.minimax, board)
+            elif (ai_future.done()
+                    and time.perf_counter() - ai_start >= AI_DELAY):
+                move, seconds = ai_future.result()
+                logger.info("AI move %s searched in %.1f ms", move,
+                            seconds * 1000)
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+                ai_future = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +184,6 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    ai_future = None
 
     pygame.display.flip()
@@ -0,0 +1,148 @@
+"""
+Precomputed solution of Tic Tac Toe
+
+Every position reachable from the empty board is solved once and the value
+and optimal move of each is written to a table file, which is generated on
+first use. After that, finding the optimal move on a board is a single
+lookup.
+
+Only canonical boards are stored (see bitboard.canonical), 765 of the 5478
+reachable boards. After MAGIC, the file holds the sorted keys of the boards
+(see bitboard.key) as little-endian 32-bit integers, followed by one byte
+per board, with the value plus one in its upper four bits and the optimal
+cell of the canonical board, or NO_MOVE if the game is over, in its lower
+four bits.
+"""
+
+import os
+
+import bitboard as bb
+
+# First bytes of the table file, bumped whenever the layout changes
+MAGIC = b"TTTSOL02"
+
+# File the table is kept in
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "solutions.bin")
+
+NO_MOVE = 15
+
+# Table of the process, mapping keys of canonical boards to their bytes,
+# see load
+table = None
+
+
+def solve():
+    """
+    Returns a dict mapping the keys of all canonical boards reachable from
+    the empty board to their bytes.
+
+    Unlike bitboard.search, no move is ever skipped, since an optimal move is
+    needed for every position the opponent can lead to.
+    """
+    solved = {}
+
+    def value(xs, os):
+        position = bb.key(xs, os)
+        if position in solved:
+            return (solved[position] >> 4) - 1
+
+        if bb.terminal(xs, os):
+            best = (bb.utility(xs, os), NO_MOVE)
+        else:
+            x_moves = bb.player(xs, os) == bb.X
+            best = None
+            for cell in bb.actions(xs, os):
+                child = value(*bb.canonical(*bb.result(xs, os, cell))[:2])
+                if (best is None or (x_moves and child > best[0])
+                        or (not x_moves and child < best[0])):
+                    best = (child, cell)
+
+        solved[position] = ((best[0] + 1) << 4) | best[1]
+        return best[0]
+
+    value(0, 0)
+    return solved
+
+
+def save(solved, path=TABLE_PATH):
+    """Writes a table to a file."""
+    keys = sorted(solved)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(b"".join(key.to_bytes(4, "little") for key in keys))
+        f.write(bytes(solved[key] for key in keys))
+    os.replace(temporary, path)
+
+
+def read(path=TABLE_PATH):
+    """Returns the table in a file, or None if there is no valid table."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    size = len(data) - len(MAGIC)
+    if data[:len(MAGIC)] != MAGIC or size <= 0 or size % 5:
+        return None
+
+    count = size // 5
+    keys = [int.from_bytes(data[i:i + 4], "little")
+            for i in range(len(MAGIC), len(MAGIC) + 4 * count, 4)]
+    return dict(zip(keys, data[len(MAGIC) + 4 * count:]))
+
+
+def load(path=TABLE_PATH):
+    """
+    Returns the table, reading it from path or, if there is no valid table
+    there yet, solving the game and writing it.
+    """
+    global table
+    if table is None:
+        table = read(path)
+        if table is None:
+            table = solve()
+            try:
+                save(table, path)
+            except OSError:
+                pass
+    return table
+
+
+def lookup(xs, os):
+    """
+    Returns the (value, optimal cell) pair of a board, the cell being None
+    if the game is over, or None if the board cannot be reached.
+    """
+    xs, os, symmetry = bb.canonical(xs, os)
+    entry = load().get(bb.key(xs, os))
+    if entry is None:
+        return None
+    cell = entry & 15
+    if cell == NO_MOVE:
+        return (entry >> 4) - 1, None
+    return (entry >> 4) - 1, bb.INVERSES[symmetry][cell]
+
+
+def book(xs, os):
+    """
+    Returns the optimal cell to take on a board, or None if the game is over
+    or the board cannot be reached, for use as the book of a mnk.Game.
+    """
+    entry = lookup(xs, os)
+    return None if entry is None else entry[1]
+
+
+def minimax(board):
+    """
+    Returns the optimal action (i, j) for the current player on a board of
+    nested lists, or None if the game is over. Boards that cannot be reached
+    in a game are searched instead.
+    """
+    xs, os = bb.from_board(board)
+    entry = lookup(xs, os)
+    if entry is None:
+        return bb.minimax(board)
+    return None if entry[1] is None else divmod(entry[1], 3)
@@ -13,3 +13,42 @@ optimal_action = minimax(board)
 print("Optimal Action:\n")
 print_board(result(board, optimal_action))
 
+
+# Check the precomputed solution table against the live search. Every
+# reachable board must have the value found by the search, and the move
+# stored for it must keep that value.
+import bitboard
+import solutions
+
+solutions.load()
+boards = [bitboard.from_board(initial_state())]
+seen = set()
+while boards:
+    xs, os = boards.pop()
+    if (xs, os) in seen:
+        continue
+    seen.add((xs, os))
+
+    value, cell = solutions.lookup(xs, os)
+    assert value == bitboard.search(xs, os)[0]
+    if bitboard.terminal(xs, os):
+        assert cell is None
+        continue
+    assert solutions.lookup(*bitboard.result(xs, os, cell))[0] == value
+    for move in bitboard.actions(xs, os):
+        boards.append(bitboard.result(xs, os, move))
+
+print("Solution table checked on " + str(len(seen)) + " boards")
+
+# Without the table as its book, the 3,3,3-game search must find moves as
+# good as the table's
+import mnk
+
+plain = mnk.Game(3, 3, 3)
+for xs, os in seen:
+    if not bitboard.terminal(xs, os):
+        cell = plain.search(xs, os)[0]
+        value = solutions.lookup(*bitboard.result(xs, os, cell))[0]
+        assert value == solutions.lookup(xs, os)[0]
+
+print("m,n,k search checked on " + str(len(seen)) + " boards")
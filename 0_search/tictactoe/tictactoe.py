@@ -5,6 +5,10 @@ Tic Tac Toe Player
 import copy
 from os import system
 
+import bitboard
+import mnk
+import solutions
+
 X = "X"
 O = "O"
 EMPTY = None
@@ -12,6 +16,14 @@ EMPTY = None
 max_count = 0
 min_count = 0
 
+# Tic Tac Toe is the 3,3,3-game, with the solution table as its book
+game = mnk.Game(3, 3, 3, book=solutions.book)
+
+# Values and optimal actions of searched boards by the key of their
+# canonical board, the actions being cells of the canonical board, see
+# abp_search and bitboard.canonical
+transpositions = {}
+
 
 def initial_state():
     """
@@ -130,9 +142,15 @@ def utility(board):
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
+
+    Moves come from game, the mnk engine playing the 3,3,3-game, which looks
+    every move up in the precomputed table of solutions and only searches
+    boards missing from it. The other backends return the same actions:
+    basic_minimax (plain minimax), abp_minimax (alpha-beta search),
+    bitboard.minimax (search on bitboards) and solutions.minimax (the table
+    alone).
     """
-    # return basic_minimax(board)
-    return abp_minimax(board)
+    return game.best_move(board)
 
 
 def basic_minimax(board):
@@ -173,55 +191,45 @@ def basic_minimax(board):
 def abp_minimax(board):
     """
     Returns the optimal action for the current player on the board. Search is
-    optimized through Alpha-beta pruning.
+    optimized through Alpha-beta pruning, and the values and optimal actions
+    of searched boards are kept in a transposition table, so every board is
+    searched only once, however many games are played.
     """
-    def maxttt(board):
-        """Calculate the max value of the board for X."""
-        if terminal(board):
-            return utility(board)
-        else:
-            max_value = None
-            for action in actions(board):
-                value = minttt(result(board, action))
-                if value == 1:  # Alpha-beta pruning
-                    return value
-                elif not max_value or value > max_value:
-                    max_value = value
-
-            return max_value
-
-    def minttt(board):
-        """Calculate the min value of the board for O."""
-        if terminal(board):
-            return utility(board)
-        else:
-            min_value = None
-            for action in actions(board):
-                value = maxttt(result(board, action))
-                if value == -1:  # Alpha-beta pruning
-                    return value
-                elif not min_value or value < min_value:
-                    min_value = value
+    return abp_search(board)[1]
 
-            return min_value
 
-    optimal_action = None
+def abp_search(board):
+    """
+    Returns the (value, optimal action) pair of the board, the action being
+    None if the game is over.
 
-    for action in actions(board):
-        if player(board) == X:
-            max_value = minttt(result(board, action))
-            # This is where Alpha-beta pruning happens. If minttt evaluates to 1, no
-            # better outcome would result from further exploration, so we can
-            # safely chose the action
-            if max_value == 1:
-                return action
-            elif not optimal_action or max_value > optimal_action[1]:
-                optimal_action = (action, max_value)
-        else:
-            min_value = maxttt(result(board, action))
-            if min_value == -1:  # Alpha-beta pruning for min branch of minimax
-                return action
-            elif not optimal_action or min_value < optimal_action[1]:
-                optimal_action = (action, min_value)
+    Rotated and reflected boards share the same entry in the transposition
+    table, which is kept for their canonical board.
+    """
+    xs, os, symmetry = bitboard.canonical(*bitboard.from_board(board))
+    key = bitboard.key(xs, os)
+    if key in transpositions:
+        value, cell = transpositions[key]
+        if cell is None:
+            return value, None
+        return value, divmod(bitboard.INVERSES[symmetry][cell], 3)
 
-    return optimal_action[0]
+    if terminal(board):
+        entry = (utility(board), None)
+    else:
+        turn = player(board)
+        entry = None
+        for action in actions(board):
+            value = abp_search(result(board, action))[0]
+            if (entry is None or (turn == X and value > entry[0])
+                    or (turn == O and value < entry[0])):
+                entry = (value, action)
+            # Alpha-beta pruning: no action can do better than a win
+            if value == (1 if turn == X else -1):
+                break
+
+    cell = None
+    if entry[1] is not None:
+        cell = bitboard.SYMMETRIES[symmetry][entry[1][0] * 3 + entry[1][1]]
+    transpositions[key] = (entry[0], cell)
+    return entry
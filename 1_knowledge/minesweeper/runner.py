@@ -1,6 +1,8 @@
+import logging
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from minesweeper import Minesweeper, MinesweeperAI
 
@@ -8,6 +10,16 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Frames drawn per second
+FPS = 30
+
+# Seconds between logged frame time summaries
+LOG_INTERVAL = 5
+
+logging.basicConfig(level=logging.INFO,
+                    format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("runner")
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -49,11 +61,54 @@ lost = False
 # Show instructions initially
 instructions = True
 
+# All work of the AI, choosing moves and drawing inferences from new
+# knowledge, is done in order by a single worker thread, so the window keeps
+# being drawn and answering events meanwhile
+executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+
+# Knowledge updates still running on the worker, checked every frame so that
+# their errors are raised and their times logged
+knowledge_futures = []
+
+clock = pygame.time.Clock()
+frame_times = []
+
+
+def timed(function, *args):
+    """Return the result of a call and the seconds it took."""
+    start = time.perf_counter()
+    return function(*args), time.perf_counter() - start
+
+
+def ai_move(ai):
+    """
+    Return the move the AI makes, a message describing it and, if no moves
+    are left, the cells the AI knows to be mines.
+    """
+    move = ai.make_safe_move()
+    if move is not None:
+        return move, "AI making safe move.", None
+    move = ai.make_random_move()
+    if move is not None:
+        return move, "No known safe moves, AI making random move.", None
+    return None, "No moves left to make.", ai.mines.copy()
+
+
 while True:
 
+    # Keep a steady frame rate and log how long frames take
+    frame_times.append(clock.tick(FPS))
+    if sum(frame_times) >= LOG_INTERVAL * 1000:
+        logger.info("%d frames, %.1f ms mean, %d ms max frame time",
+                    len(frame_times), sum(frame_times) / len(frame_times),
+                    max(frame_times))
+        frame_times = []
+
     # Check if game quit
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            executor.shutdown(wait=False)
             sys.exit()
 
     screen.fill(BLACK)
@@ -153,7 +208,10 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    if ai_future is not None:
+        text = "Thinking" + "." * (int(time.perf_counter() * 3) % 4)
+    else:
+        text = "Lost" if lost else "Won" if game.mines == flags else ""
     text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
@@ -161,6 +219,21 @@ while True:
 
     move = None
 
+    # Finish knowledge updates the worker is done with
+    for future in [f for f in knowledge_futures if f.done()]:
+        knowledge_futures.remove(future)
+        _, seconds = future.result()
+        logger.info("AI knowledge added in %.1f ms", seconds * 1000)
+
+    # Play the AI's move once the worker has found it
+    if ai_future is not None and ai_future.done():
+        (move, message, mines), seconds = ai_future.result()
+        ai_future = None
+        print(message)
+        logger.info("AI move %s chosen in %.1f ms", move, seconds * 1000)
+        if mines is not None:
+            flags = mines
+
     left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
@@ -178,18 +251,10 @@ while True:
     elif left == 1:
         mouse = pygame.mouse.get_pos()
 
-        # If AI button clicked, make an AI move
+        # If AI button clicked, have the worker find an AI move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
+            if ai_future is None:
+                ai_future = executor.submit(timed, ai_move, ai)
             time.sleep(0.2)
 
         # Reset game state
@@ -199,10 +264,12 @@ while True:
             revealed = set()
             flags = set()
             lost = False
+            ai_future = None
+            knowledge_futures = []
             continue
 
-        # User-made move
-        elif not lost:
+        # User-made move, unless the AI is about to make one
+        elif not lost and ai_future is None and move is None:
             for i in range(HEIGHT):
                 for j in range(WIDTH):
                     if (cells[i][j].collidepoint(mouse)
@@ -217,6 +284,7 @@ while True:
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            knowledge_futures.append(
+                executor.submit(timed, ai.add_knowledge, move, nearby))
 
     pygame.display.flip()